@@ -0,0 +1,147 @@
+"""语法高亮基准
+
+1. 对比旧版逐规则高亮与单次扫描高亮的完整重新高亮耗时；
+2. 在编辑器中载入 / 粘贴 1 万、5 万、15 万行时，对比不高亮、完整同步高亮与视口优先的延迟高亮的可交互时间。
+
+用法：python benchmarks/bench_highlight.py [行数]
+"""
+import os
+import re
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtWidgets import QApplication, QPlainTextEdit
+from PySide6.QtGui import QTextDocument, QTextCharFormat, QSyntaxHighlighter, QColor, QTextCursor
+
+from sidepython import PythonSyntaxHighlighter
+
+SAMPLE = '''\
+def compute(values, scale=2.5):
+    """Return scaled values."""
+    result = [v * scale for v in values if v is not None]
+    for i, (a, b) in enumerate(zip(result, result[1:])):
+        print(f"{i}: {a} -> {b}", {'delta': (b - a) / 3})  # 差值
+    return {"sum": sum(result), 'max': max(result or [0])}
+
+'''
+
+
+class LegacyHighlighter(QSyntaxHighlighter):
+    """旧版实现：每个关键字单独一个未编译的正则，括号格式逐字符新建"""
+    def __init__(self, document):
+        super().__init__(document)
+        self.highlighting_rules = []
+        keyword_format = QTextCharFormat()
+        keyword_format.setForeground(QColor("#569cd6"))
+        keyword_format.setFontWeight(700)
+        for keyword in PythonSyntaxHighlighter.KEYWORDS:
+            self.highlighting_rules.append((f"\\b{keyword}\\b", keyword_format))
+        string_format = QTextCharFormat()
+        string_format.setForeground(QColor("#ce9178"))
+        self.highlighting_rules.append(('"[^"\\\\]*(\\\\.[^"\\\\]*)*"', string_format))
+        self.highlighting_rules.append(("'[^'\\\\]*(\\\\.[^'\\\\]*)*'", string_format))
+        comment_format = QTextCharFormat()
+        comment_format.setForeground(QColor("#6a9955"))
+        self.highlighting_rules.append(("#[^\\n]*", comment_format))
+        number_format = QTextCharFormat()
+        number_format.setForeground(QColor("#b5cea8"))
+        self.highlighting_rules.append(("\\b\\d+\\.?\\d*\\b", number_format))
+        self.bracket_colors = [QColor("#ffd700"), QColor("#da70d6"), QColor("#87ceeb"), QColor("#98fb98")]
+
+    def highlightBlock(self, text):
+        for pattern, format in self.highlighting_rules:
+            for match in re.finditer(pattern, text):
+                start, end = match.span()
+                self.setFormat(start, end - start, format)
+        bracket_stack = []
+        for i, char in enumerate(text):
+            if char in '([{':
+                bracket_format = QTextCharFormat()
+                bracket_format.setForeground(self.bracket_colors[len(bracket_stack) % 4])
+                bracket_format.setFontWeight(700)
+                self.setFormat(i, 1, bracket_format)
+                bracket_stack.append(char)
+            elif char in ')]}':
+                if bracket_stack:
+                    bracket_stack.pop()
+                bracket_format = QTextCharFormat()
+                bracket_format.setForeground(self.bracket_colors[len(bracket_stack) % 4])
+                bracket_format.setFontWeight(700)
+                self.setFormat(i, 1, bracket_format)
+
+
+class EagerHighlighter(PythonSyntaxHighlighter):
+    """关闭时间预算，所有块都同步高亮"""
+    SLICE_BUDGET = float('inf')
+    LARGE_EDIT = float('inf')
+
+
+def measure(highlighter_class, text, repeat=3):
+    """返回多次完整重新高亮中的最短耗时（秒）"""
+    document = QTextDocument()
+    document.setPlainText(text)
+    highlighter = highlighter_class(document)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        highlighter.rehighlight()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure_load(app, highlighter_class, text):
+    """在可见的编辑器中载入文本，再在末尾粘贴同样的文本，返回两次直到事件循环再次空闲的耗时（秒）
+
+    highlighter_class 为 None 时不高亮，作为基线。
+    """
+    editor = QPlainTextEdit()
+    editor.resize(600, 400)
+    editor.show()
+    if highlighter_class is not None:
+        highlighter_class(editor.document(), editor)
+    app.processEvents()
+    start = time.perf_counter()
+    editor.setPlainText(text)
+    app.processEvents()
+    load = time.perf_counter() - start
+
+    cursor = editor.textCursor()
+    cursor.movePosition(QTextCursor.End)
+    start = time.perf_counter()
+    cursor.insertText(text)
+    app.processEvents()
+    return load, time.perf_counter() - start
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    sample_lines = SAMPLE.count('\n')
+    text = SAMPLE * (lines // sample_lines + 1)
+    text = '\n'.join(text.split('\n')[:lines])
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    old = measure(LegacyHighlighter, text)
+    new = measure(PythonSyntaxHighlighter, text)
+    scale = 10000 / lines
+
+    print(f"行数:              {lines}")
+    print(f"旧版 / 1 万行:     {old * scale * 1000:.1f} ms")
+    print(f"新版 / 1 万行:     {new * scale * 1000:.1f} ms")
+    print(f"加速比:            {old / new:.1f}x")
+
+    print("可交互时间（载入 / 粘贴，ms）：")
+    for count in (10000, 50000, 150000):
+        load_text = '\n'.join((SAMPLE * (count // sample_lines + 1)).split('\n')[:count])
+        row = [measure_load(app, cls, load_text) for cls in (None, EagerHighlighter, PythonSyntaxHighlighter)]
+        cells = " · ".join(
+            f"{label} {load * 1000:.0f} / {paste * 1000:.0f}"
+            for label, (load, paste) in zip(("不高亮", "同步高亮", "视口优先"), row)
+        )
+        print(f"  {count // 10000:>2} 万行：{cells}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""启动耗时基准
+
+在新进程中以 offscreen 方式启动完整的 SidePython 窗口，测量从启动进程到第一帧绘制完成的时间，
+以及其中导入模块、创建 QApplication、构建窗口各阶段的耗时和托盘等延后工作的完成时间。
+每次都使用临时的用户目录（默认配置、无缓存），结果取多次的中位数。
+
+用法：python benchmarks/bench_startup.py [次数]
+"""
+import os
+import sys
+import json
+import time
+import statistics
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHASES = [
+    ("import", "导入模块"),
+    ("app", "创建 QApplication"),
+    ("window", "构建窗口"),
+    ("first_frame", "显示到第一帧"),
+    ("deferred", "第一帧到托盘就绪"),
+]
+
+
+def child():
+    """子进程：启动窗口，第一帧之后把各阶段耗时以一行 JSON 写到标准输出"""
+    t0 = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    import sidepython
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtCore import QObject, QEvent, QTimer
+    t_import = time.perf_counter()
+
+    app = QApplication([])
+    app.setStyle('Fusion')
+    app.setStyleSheet(sidepython.APP_STYLE)
+    t_app = time.perf_counter()
+
+    window = sidepython.SidePython()
+    t_window = time.perf_counter()
+    times = {}
+
+    def report():
+        if window.tray_icon is None:
+            QTimer.singleShot(1, report)
+            return
+        t_deferred = time.perf_counter()
+        print(json.dumps({
+            "import": t_import - t0,
+            "app": t_app - t_import,
+            "window": t_window - t_app,
+            "first_frame": times["frame"] - t_window,
+            "deferred": t_deferred - times["frame"],
+        }), flush=True)
+        window.server.stop()
+        window.runner.shutdown()
+        app.quit()
+
+    class FirstPaint(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint and "frame" not in times:
+                # 本轮绘制结束（所有控件画完）后再记时
+                times["frame"] = None
+                QTimer.singleShot(0, on_frame)
+            return False
+
+    def on_frame():
+        times["frame"] = time.perf_counter()
+        report()
+
+    watcher = FirstPaint()
+    app.installEventFilter(watcher)
+    window.show()
+    app.exec()
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    samples = []
+    totals = []
+    with tempfile.TemporaryDirectory() as home:
+        # 使用默认配置，且不与正在运行的实例共用本地服务
+        env["HOME"] = env["USERPROFILE"] = home
+        for _ in range(runs):
+            start = time.perf_counter()
+            process = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "--child"],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env, text=True
+            )
+            line = process.stdout.readline()
+            totals.append(time.perf_counter() - start - json.loads(line)["deferred"])
+            samples.append(json.loads(line))
+            process.wait()
+
+    print(f"启动 {runs} 次（中位数）：")
+    print(f"  进程启动到第一帧：{statistics.median(totals) * 1000:8.1f} ms")
+    for key, label in PHASES:
+        print(f"  {label}：{statistics.median(s[key] for s in samples) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    if "--child" in sys.argv[1:]:
+        child()
+    else:
+        main()
@@ -0,0 +1,87 @@
+"""流式输出吞吐与界面响应基准
+
+以 offscreen 方式在 Qt 事件循环中运行 GUI 实际使用的 CodeRunner 和 OutputView：执行进程中跑一个
+紧密的 print 循环，输出经 CodeRunner 的定时轮询写入输出面板。同时用一个 5ms 的 QTimer 心跳测量
+事件循环的最大间隔（界面无响应的最长时间），与每秒显示的行数一起报告。
+
+用法：python benchmarks/bench_stream.py [行数]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QTimer
+
+from sidepython import CodeRunner, OutputView
+from sidepython_engine import DEFAULT_CONFIG
+
+HEARTBEAT_MS = 5
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    code = f"for i in range({lines}):\n    print('line', i)\n"
+
+    app = QApplication([])
+    config = dict(DEFAULT_CONFIG, workers=1)
+    runner = CodeRunner(config)
+    view = OutputView(config["output_max_lines"], config["output_max_chars"])
+    view.resize(800, 600)
+    view.show()
+
+    stats = {'received': 0, 'batches': 0, 'worst_gap': 0.0, 'worst_append': 0.0}
+    last_beat = [None]
+
+    def on_output(chunks):
+        stats['received'] += sum(text.count('\n') for _, text in chunks)
+        stats['batches'] += 1
+
+    def on_beat():
+        now = time.perf_counter()
+        if last_beat[0] is not None:
+            stats['worst_gap'] = max(stats['worst_gap'], now - last_beat[0])
+        last_beat[0] = now
+
+    def timed_append(chunks):
+        t0 = time.perf_counter()
+        view.append_chunks(chunks)
+        stats['worst_append'] = max(stats['worst_append'], time.perf_counter() - t0)
+
+    runner.output.connect(timed_append)
+    runner.output.connect(on_output)
+    runner.finished.connect(lambda result: app.quit())
+
+    heartbeat = QTimer()
+    heartbeat.setInterval(HEARTBEAT_MS)
+    heartbeat.timeout.connect(on_beat)
+
+    # 等待执行进程就绪，避免把启动时间算进来
+    runner.pool.start()
+    while not runner.pool.workers[0].check_ready():
+        time.sleep(0.01)
+
+    def start():
+        stats['start'] = time.perf_counter()
+        heartbeat.start()
+        runner.run(code, {})
+
+    QTimer.singleShot(0, start)
+    app.exec()
+    elapsed = time.perf_counter() - stats['start']
+    heartbeat.stop()
+    runner.shutdown()
+
+    print(f"行数:              {stats['received']}")
+    print(f"总耗时:            {elapsed:.3f} s")
+    print(f"吞吐:              {stats['received'] / elapsed:,.0f} 行/秒")
+    print(f"输出批次:          {stats['batches']}")
+    print(f"单批写入面板最长:  {stats['worst_append'] * 1000:.1f} ms")
+    print(f"事件循环最大间隔:  {stats['worst_gap'] * 1000:.1f} ms（心跳 {HEARTBEAT_MS} ms）")
+
+
+if __name__ == '__main__':
+    main()
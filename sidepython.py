@@ -1,13 +1,33 @@
 import sys
+
+if __name__ == '__main__' and '--run' in sys.argv[1:]:
+    # 无界面模式：不导入 Qt，直接执行代码
+    from sidepython_engine import cli_main
+    sys.exit(cli_main(sys.argv[1:]))
+
+if __name__ == '__main__' and not any(arg.startswith('--') for arg in sys.argv[1:]):
+    # 已有实例在运行时只让它显示窗口（并打开给定的文件）后立即退出，不再启动第二个 Qt 程序
+    from sidepython_engine import forward_to_instance
+    if forward_to_instance(sys.argv[1:]):
+        sys.exit(0)
+
 import os
-from io import StringIO
+import re
+import json
+import time
+import threading
+import multiprocessing
+from collections import deque, OrderedDict
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QTextEdit, QPlainTextEdit, QPushButton, QLabel, QLineEdit,
-    QFrame, QSplitter, QSystemTrayIcon, QMenu
+    QPlainTextEdit, QTextEdit, QPushButton, QLabel, QLineEdit,
+    QFrame, QSplitter, QSystemTrayIcon, QMenu, QDialog, QTableView,
+    QHeaderView, QFileDialog, QTableWidget, QTableWidgetItem, QToolTip,
+    QDockWidget, QTabWidget, QTreeWidget, QTreeWidgetItem
 )
-from PySide6.QtCore import Qt, QTimer
-from PySide6.QtGui import QFont, QTextCharFormat, QSyntaxHighlighter, QColor, QShortcut, QKeySequence, QIcon, QPixmap, QPainter
+from PySide6.QtCore import Qt, QTimer, QObject, Signal, SIGNAL, SLOT, QAbstractTableModel, QModelIndex, QEvent, QPoint, QRectF
+from PySide6.QtNetwork import QLocalServer, QLocalSocket
+from PySide6.QtGui import QFont, QTextCharFormat, QSyntaxHighlighter, QColor, QShortcut, QKeySequence, QIcon, QPixmap, QPainter, QTextCursor
 
 # Windows注册表操作
 try:
@@ -28,45 +48,101 @@ try:
 except Exception:
     HOTKEY_AVAILABLE = False
 
+from sidepython_engine import (
+    WorkerPool, MemoCache, InputError, load_config, parse_inputs, var_name, server_address,
+    expand_grid, format_sweep_stats, write_sweep_csv, format_size, format_cells_summary,
+    format_run_stats, format_benchmark, format_duration, SyntaxCheckProcess,
+    call_graph, call_roots, func_label, collapsed_stacks, write_pstats
+)
+
 
 class PythonSyntaxHighlighter(QSyntaxHighlighter):
-    """Python语法高亮器"""
-    def __init__(self, document):
-        super().__init__(document)
-        
-        # 定义高亮规则
-        self.highlighting_rules = []
-        
-        # 关键字
+    """Python语法高亮器（预编译的单次扫描）
+
+    跨行的三引号字符串和括号层级记录在块状态中：
+    状态 = 括号层级 * 4 + 未闭合的三引号种类（0 无，1 单引号，2 双引号）。
+    编辑后 Qt 只会继续重新高亮状态发生变化的后续行。
+    """
+    KEYWORDS = [
+        "class", "def", "if", "else", "elif",
+        "for", "while", "try", "except", "finally",
+        "with", "import", "from", "as", "return",
+        "True", "False", "None", "and", "or",
+        "not", "in", "is", "lambda", "yield"
+    ]
+
+    # 所有规则合并为一个正则，按位置从左到右一次扫描；
+    # 字符串和注释整体匹配，其中的关键字、数字、括号不会再被着色
+    TOKEN_RE = re.compile(r"""
+        (?P<comment>\#[^\n]*)
+      | (?P<triple>\"\"\"[^"\\]*(?:(?:\\.|"(?!""))[^"\\]*)*\"\"\"|'''[^'\\]*(?:(?:\\.|'(?!''))[^'\\]*)*''')
+      | (?P<triple_open>\"\"\"|''')
+      | (?P<string>"[^"\\]*(?:\\.[^"\\]*)*"|'[^'\\]*(?:\\.[^'\\]*)*')
+      | (?P<keyword>\b(?:""" + "|".join(KEYWORDS) + r""")\b)
+      | (?P<number>\b\d+\.?\d*\b)
+      | (?P<open>[(\[{])
+      | (?P<close>[)\]}])
+    """, re.VERBOSE)
+
+    # 三引号种类 -> 匹配到闭合引号为止的正则
+    TRIPLE_QUOTES = {"'''": 1, '"""': 2}
+    TRIPLE_END_RE = {
+        1: re.compile(r"[^'\\]*(?:(?:\\.|'(?!''))[^'\\]*)*'''"),
+        2: re.compile(r'[^"\\]*(?:(?:\\.|"(?!""))[^"\\]*)*"""'),
+    }
+    MAX_DEPTH = 255  # 块状态中记录的最大括号层级
+
+    SLICE_BUDGET = 0.008  # 每次编辑 / 每个空闲时间片用于屏幕外高亮的时间（秒）
+    LARGE_EDIT = 20000  # 一次插入超过该字符数视为大批量粘贴，暂时断开 Qt 的逐块高亮，全部推迟到空闲时
+    REFORMAT = ('contentsChange(int,int,int)', '_q_reformatBlocks(int,int,int)')  # Qt 内部的重新高亮连接
+
+    def __init__(self, document, editor=None):
+        # 先连接自己的 contentsChange 处理再挂到文档上，
+        # 保证 Qt 重新高亮之前已设定好本次的时间预算
+        super().__init__(None)
+        self.editor = editor  # 用于确定可见区域，可为空
+        self.deadline = None  # 超过该时间后屏幕外的块推迟到空闲时处理
+        self.deferring = False  # 本段工作是否已超出预算
+        self.visible = (0, -1)  # 当前可见的块号范围
+        self.dirty_from = None  # 待补高亮的块号范围
+        self.dirty_to = None
+        self.viewport_pending = False  # 可见区域是否需要优先补高亮
+        self.last_highlighted = -1  # 最近一次实际高亮的块号
+        self.detached = False  # 是否已断开 Qt 对文档改动的自动重新高亮
+
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.setInterval(0)
+        self.idle_timer.timeout.connect(self._highlight_idle)
+
+        document.contentsChange.connect(self._on_contents_change)
+        self.setDocument(document)
+        self.setParent(document)  # 与 QSyntaxHighlighter(document) 一样归文档所有
+        if editor is not None:
+            editor.verticalScrollBar().valueChanged.connect(self._on_scroll)
+
+        # 所有格式只创建一次
         keyword_format = QTextCharFormat()
         keyword_format.setForeground(QColor("#569cd6"))
         keyword_format.setFontWeight(700)
-        keywords = [
-            "\\bclass\\b", "\\bdef\\b", "\\bif\\b", "\\belse\\b", "\\belif\\b",
-            "\\bfor\\b", "\\bwhile\\b", "\\btry\\b", "\\bexcept\\b", "\\bfinally\\b",
-            "\\bwith\\b", "\\bimport\\b", "\\bfrom\\b", "\\bas\\b", "\\breturn\\b",
-            "\\bTrue\\b", "\\bFalse\\b", "\\bNone\\b", "\\band\\b", "\\bor\\b",
-            "\\bnot\\b", "\\bin\\b", "\\bis\\b", "\\blambda\\b", "\\byield\\b"
-        ]
-        for pattern in keywords:
-            self.highlighting_rules.append((pattern, keyword_format))
-        
-        # 字符串
+
         string_format = QTextCharFormat()
         string_format.setForeground(QColor("#ce9178"))
-        self.highlighting_rules.append(('"[^"\\\\]*(\\\\.[^"\\\\]*)*"', string_format))
-        self.highlighting_rules.append(("'[^'\\\\]*(\\\\.[^'\\\\]*)*'", string_format))
-        
-        # 注释
+
         comment_format = QTextCharFormat()
         comment_format.setForeground(QColor("#6a9955"))
-        self.highlighting_rules.append(("#[^\\n]*", comment_format))
-        
-        # 数字
+
         number_format = QTextCharFormat()
         number_format.setForeground(QColor("#b5cea8"))
-        self.highlighting_rules.append(("\\b\\d+\\.?\\d*\\b", number_format))
-        
+
+        self.formats = {
+            'keyword': keyword_format,
+            'string': string_format,
+            'triple': string_format,
+            'comment': comment_format,
+            'number': number_format,
+        }
+
         # 括号颜色（按层级）
         self.bracket_colors = [
             QColor("#ffd700"),  # 金色
@@ -74,41 +150,1375 @@ class PythonSyntaxHighlighter(QSyntaxHighlighter):
             QColor("#87ceeb"),  # 天蓝色
             QColor("#98fb98"),  # 浅绿色
         ]
-    
+        self.bracket_formats = []
+        for color in self.bracket_colors:
+            bracket_format = QTextCharFormat()
+            bracket_format.setForeground(color)
+            bracket_format.setFontWeight(700)
+            self.bracket_formats.append(bracket_format)
+
+    def _begin_work(self, budget):
+        """开始一段高亮工作：设定截止时间并记录可见区域"""
+        self.deadline = time.perf_counter() + budget
+        self.deferring = False
+        if self.editor is not None:
+            first = self.editor.firstVisibleBlock().blockNumber()
+            line_height = max(1, self.editor.fontMetrics().height())
+            self.visible = (first, first + self.editor.viewport().height() // line_height + 1)
+
+    def _mark_dirty(self, first, last=None):
+        """记录推迟处理的块，并安排空闲时补上"""
+        last = first if last is None else last
+        self.dirty_from = first if self.dirty_from is None else min(self.dirty_from, first)
+        self.dirty_to = last if self.dirty_to is None else max(self.dirty_to, last)
+        if not self.idle_timer.isActive():
+            self.idle_timer.start()
+
+    def _set_attached(self, attached):
+        """连接或断开 Qt 在文档改动后逐块调用 highlightBlock 的内部连接"""
+        signal, slot = self.REFORMAT
+        if attached:
+            QObject.connect(self.document(), SIGNAL(signal), self, SLOT(slot))
+        else:
+            QObject.disconnect(self.document(), SIGNAL(signal), self, SLOT(slot))
+        self.detached = not attached
+
+    def _on_contents_change(self, position, removed, added):
+        """文档即将被重新高亮：大批量插入时不让 Qt 逐块高亮，只记录范围，空闲时先补可见区域"""
+        document = self.document()
+        if self.dirty_from is not None:
+            # 块号可能已整体移动，保守地把待处理范围延伸到文末
+            self.dirty_to = document.blockCount() - 1
+        if added >= self.LARGE_EDIT or self.detached:
+            # Qt 的连接排在本处理之后，此时断开即可跳过这次逐块高亮；
+            # 否则即使只做标记，每块仍要调用一次 Python 的 highlightBlock，耗时与文件大小成正比
+            if not self.detached:
+                self._set_attached(False)
+            last = document.findBlock(position + added).blockNumber()
+            self._mark_dirty(document.findBlock(position).blockNumber(), last if last >= 0 else document.blockCount() - 1)
+            self.viewport_pending = True
+            return
+        self._begin_work(self.SLICE_BUDGET)
+
+    def _on_scroll(self):
+        """滚动到尚未高亮的区域时优先处理可见部分"""
+        if self.dirty_from is not None:
+            self.viewport_pending = True
+            self.idle_timer.start()
+
+    def _highlight_idle(self):
+        """空闲时间片：先补可见区域，再按顺序处理推迟的块"""
+        if self.dirty_from is None:
+            return
+        document = self.document()
+        self._begin_work(self.SLICE_BUDGET)
+        if self.detached:
+            # 大批量插入已经结束，之后的普通编辑仍由 Qt 即时高亮
+            self._set_attached(True)
+
+        if self.viewport_pending:
+            self.viewport_pending = False
+            first = max(self.visible[0], self.dirty_from)
+            last = min(self.visible[1], self.dirty_to)
+            block = document.findBlockByNumber(first)
+            while block.isValid() and block.blockNumber() <= last:
+                self.rehighlightBlock(block)
+                block = block.next()
+
+        first, last = self.dirty_from, self.dirty_to
+        self.dirty_from = self.dirty_to = None
+        block = document.findBlockByNumber(first)
+        while block.isValid() and block.blockNumber() <= last:
+            if time.perf_counter() >= self.deadline:
+                self._mark_dirty(block.blockNumber(), last)
+                break
+            self.rehighlightBlock(block)
+            # 跳过 Qt 级联时已顺带处理的块
+            block = document.findBlockByNumber(max(block.blockNumber(), self.last_highlighted) + 1)
+
     def highlightBlock(self, text):
-        import re
-        
-        # 先应用基本的语法高亮规则
-        for pattern, format in self.highlighting_rules:
-            for match in re.finditer(pattern, text):
-                start, end = match.span()
-                self.setFormat(start, end - start, format)
-        
-        # 单独处理括号的多层级着色
-        bracket_stack = []
-        brackets = {'(': ')', '[': ']', '{': '}'}
-        closing_brackets = {')', ']', '}'}
-        
-        for i, char in enumerate(text):
-            if char in brackets:
-                # 开括号
-                level = len(bracket_stack)
-                color = self.bracket_colors[level % len(self.bracket_colors)]
-                bracket_format = QTextCharFormat()
-                bracket_format.setForeground(color)
-                bracket_format.setFontWeight(700)
-                self.setFormat(i, 1, bracket_format)
-                bracket_stack.append(char)
-            elif char in closing_brackets:
-                # 闭括号
-                if bracket_stack:
-                    bracket_stack.pop()
-                level = len(bracket_stack)
-                color = self.bracket_colors[level % len(self.bracket_colors)]
-                bracket_format = QTextCharFormat()
-                bracket_format.setForeground(color)
-                bracket_format.setFontWeight(700)
-                self.setFormat(i, 1, bracket_format)
+        # 超出时间预算后，屏幕外的块只做标记，不改变状态，从而截断级联重新高亮
+        if self.deferring or (self.deadline is not None and time.perf_counter() >= self.deadline):
+            self.deferring = True
+            number = self.currentBlock().blockNumber()
+            if not self.visible[0] <= number <= self.visible[1]:
+                if self.dirty_from is not None and self.dirty_from <= number:
+                    self.dirty_to = max(self.dirty_to, number)
+                else:
+                    self._mark_dirty(number)
+                return
+        self.last_highlighted = self.currentBlock().blockNumber()
+
+        formats = self.formats
+        bracket_formats = self.bracket_formats
+        levels = len(bracket_formats)
+
+        # 从上一行继承括号层级和未闭合的三引号字符串
+        state = max(self.previousBlockState(), 0)
+        depth, string_kind = divmod(state, 4)
+        pos = 0
+
+        if string_kind:
+            match = self.TRIPLE_END_RE[string_kind].match(text)
+            if match is None:
+                # 整行仍在字符串内
+                self.setFormat(0, len(text), formats['string'])
+                self.setCurrentBlockState(state)
+                return
+            pos = match.end()
+            self.setFormat(0, pos, formats['string'])
+            string_kind = 0
+
+        for match in self.TOKEN_RE.finditer(text, pos):
+            kind = match.lastgroup
+            start = match.start()
+            if kind == 'open':
+                self.setFormat(start, 1, bracket_formats[depth % levels])
+                depth += 1
+            elif kind == 'close':
+                # 闭括号与对应的开括号同色
+                if depth:
+                    depth -= 1
+                self.setFormat(start, 1, bracket_formats[depth % levels])
+            elif kind == 'triple_open':
+                # 三引号字符串延续到下一行
+                self.setFormat(start, len(text) - start, formats['string'])
+                string_kind = self.TRIPLE_QUOTES[match.group()]
+                break
+            else:
+                self.setFormat(start, match.end() - start, formats[kind])
+
+        self.setCurrentBlockState(min(depth, self.MAX_DEPTH) * 4 + string_kind)
+
+
+class OutputView(QPlainTextEdit):
+    """有界的输出面板：超出行数或字符数上限时淘汰最早的内容，并在顶部标注已截断的行数"""
+    def __init__(self, max_lines=10000, max_chars=2000000, parent=None):
+        super().__init__(parent)
+        self.max_lines = max(10, max_lines)
+        self.max_chars = max(1000, max_chars)
+        self.truncated_lines = 0  # 已淘汰的行数
+        self.has_marker = False  # 首行是否为截断标记
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)  # 只读输出不需要撤销栈
+
+        self.stdout_format = QTextCharFormat()
+        self.stdout_format.setForeground(QColor("#d4d4d4"))
+        self.stderr_format = QTextCharFormat()
+        self.stderr_format.setForeground(QColor("#f48771"))
+        self.marker_format = QTextCharFormat()
+        self.marker_format.setForeground(QColor("#808080"))
+        self.marker_format.setFontItalic(True)
+
+    def append_chunks(self, chunks):
+        """追加一批流式输出 [(流名称, 文本), ...]，stderr 以红色显示"""
+        scrollbar = self.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 4
+
+        chunks, dropped = self._tail(chunks)
+        cursor = QTextCursor(self.document())
+        if dropped:
+            # 这一批本身就超出上限：面板中原有的内容反正都要淘汰，直接删掉，不必先插入再删除
+            self.truncated_lines += dropped + self._body_lines()
+            cursor.movePosition(QTextCursor.Start)
+            if self.has_marker:
+                cursor.movePosition(QTextCursor.NextBlock)
+            cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
+            cursor.removeSelectedText()
+        cursor.movePosition(QTextCursor.End)
+        for name, text in chunks:
+            cursor.insertText(text, self.stderr_format if name == 'stderr' else self.stdout_format)
+        self._trim()
+        if dropped:
+            self._update_marker()
+
+        # 只有原本停在底部时才自动滚动，方便回看
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+    def _tail(self, chunks):
+        """一批输出超出上限的 90% 时只保留末尾的完整行，返回 (保留的输出, 丢弃的行数)"""
+        max_lines = int(self.max_lines * 0.9)
+        max_chars = int(self.max_chars * 0.9)
+        lines = chars = 0
+        for index in range(len(chunks) - 1, -1, -1):
+            name, text = chunks[index]
+            count = text.count('\n')
+            if lines + count < max_lines and chars + len(text) <= max_chars:
+                lines += count
+                chars += len(text)
+                continue
+            # 在这一块中截断：先按字符数，再按行数，切在换行之后
+            cut = max(0, len(text) - (max_chars - chars))
+            pos = len(text)
+            for _ in range(max_lines - lines):
+                pos = text.rfind('\n', cut, pos)
+                if pos < 0:
+                    break
+            else:
+                cut = max(cut, pos)
+            newline = text.find('\n', cut)
+            if newline >= 0:
+                cut = newline + 1
+            dropped = text.count('\n', 0, cut) + sum(t.count('\n') for _, t in chunks[:index])
+            kept = chunks[index + 1:]
+            if cut < len(text):
+                kept.insert(0, (name, text[cut:]))
+            return kept, dropped
+        return chunks, 0
+
+    def _body_lines(self):
+        """截断标记之外的换行数（末行未换行时，它的剩余部分在新输出中）"""
+        return self.document().blockCount() - self.has_marker - 1
+
+    def append_message(self, text):
+        """另起一行追加提示信息"""
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        # 末行为空（如输出以换行结尾）时直接写入，不再多空一行
+        if cursor.block().length() > 1:
+            cursor.insertBlock()
+        cursor.insertText(text, self.stdout_format)
+        self._trim()
+        self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+
+    def clear(self):
+        super().clear()
+        self.truncated_lines = 0
+        self.has_marker = False
+
+    def _trim(self):
+        """超出上限时淘汰最早的行，一次削减到上限的 90%，避免每次追加都触发"""
+        doc = self.document()
+        lines = doc.blockCount() - self.has_marker
+        chars = doc.characterCount()
+        if lines <= self.max_lines and chars <= self.max_chars:
+            if self.truncated_lines and not self.has_marker:
+                self._update_marker()
+            return
+
+        target_lines = int(self.max_lines * 0.9)
+        target_chars = int(self.max_chars * 0.9)
+        block = doc.findBlockByNumber(int(self.has_marker))
+        remove = 0
+        removed_chars = 0
+        # 至少保留最后一行
+        while block.next().isValid() and (lines - remove > target_lines or chars - removed_chars > target_chars):
+            removed_chars += block.length()
+            remove += 1
+            block = block.next()
+
+        if remove:
+            cursor = QTextCursor(doc)
+            cursor.movePosition(QTextCursor.Start)
+            if self.has_marker:
+                cursor.movePosition(QTextCursor.NextBlock)
+            cursor.movePosition(QTextCursor.NextBlock, QTextCursor.KeepAnchor, remove)
+            # 放在一个编辑块中删除，文档布局只在结束时更新一次，耗时约减半
+            cursor.beginEditBlock()
+            cursor.removeSelectedText()
+            cursor.endEditBlock()
+            self.truncated_lines += remove
+        self._update_marker()
+
+    def _update_marker(self):
+        """插入或刷新顶部的截断标记"""
+        text = f"… 已截断较早的 {self.truncated_lines} 行 …"
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.Start)
+        if self.has_marker:
+            cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
+            cursor.insertText(text, self.marker_format)
+        else:
+            cursor.insertText(text, self.marker_format)
+            cursor.insertBlock()
+            self.has_marker = True
+
+
+class CodeRunner(QObject):
+    """在后台进程中执行代码，通过信号回传结果"""
+    started = Signal()
+    progress = Signal(str)  # 运行进度描述
+    output = Signal(list)  # 一批流式输出 [(流名称, 文本), ...]
+    finished = Signal(dict)
+
+    def __init__(self, config, parent=None):
+        super().__init__(parent)
+        # 预导入模块等界面空闲后再开始（见 SidePython.prewarm）
+        self.pool = WorkerPool(config, preload=False)
+        self.memo = MemoCache(max_bytes=config.get("memo_max_mb", 64) * 1024 * 1024)
+        self.memo_key = None  # 本次执行结束后写入结果缓存的键
+        self.memo_chunks = []  # 本次执行的输出，用于写入结果缓存
+        self.memo_size = 0
+        self.current = None
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(30)
+        self.poll_timer.timeout.connect(self._poll)
+
+    def is_running(self):
+        """是否有代码正在执行"""
+        return self.current is not None
+
+    def run(self, code, variables, timeout=0, session=False, cells=False, memo=False, refresh=False):
+        """启动一次执行；session 为 True 时在保留命名空间的会话进程中执行，
+        cells 为 True 时按 # %% 单元格增量执行。
+
+        memo 为 True 时（会话和单元格模式除外）先查结果缓存，命中则直接回放上次的输出；
+        refresh 为 True 时忽略已有缓存重新执行，并用新结果覆盖。
+        """
+        if self.is_running():
+            return
+        if memo and not (session or cells):
+            key = self.memo.key(code, variables)
+            cached = None if refresh else self.memo.get(key)
+            if cached is not None:
+                self.started.emit()
+                if cached['chunks']:
+                    self.output.emit([tuple(chunk) for chunk in cached['chunks']])
+                self.finished.emit(dict(cached['result'], memo_hit=True))
+                return
+            self.memo_key, self.memo_chunks, self.memo_size = key, [], 0
+        self._start(self.pool.run(code, variables, timeout, session, cells))
+
+    def run_profile(self, code, variables, timeout=0, mode='lines'):
+        """启动一次性能分析执行"""
+        if self.is_running():
+            return
+        self._start(self.pool.run_profile(code, variables, timeout, mode))
+
+    def run_benchmark(self, code, variables, timeout=0):
+        """启动一次基准测试"""
+        if self.is_running():
+            return
+        self._start(self.pool.run_benchmark(code, variables, timeout))
+
+    def run_sweep(self, code, names, points, timeout=0):
+        """启动一次批量执行"""
+        if self.is_running():
+            return
+        self._start(self.pool.run_sweep(code, names, points, timeout))
+
+    def _start(self, run):
+        self.current = run
+        self.poll_timer.start()
+        self.started.emit()
+
+    def cancel(self):
+        """静默终止当前执行（不发出 finished 信号），用于丢弃结果已过时的执行"""
+        if not self.is_running():
+            return
+        self.current.terminate()
+        self.poll_timer.stop()
+        self.current = None
+        self.memo_key, self.memo_chunks = None, []
+
+    def stop(self):
+        """终止当前执行"""
+        if not self.is_running():
+            return
+        self.current.terminate()
+        self._finish({'ok': False, 'output': '', 'error': "执行已被手动停止", 'stopped': True})
+
+    def _poll(self):
+        """定时检查子进程状态，并把这段时间内的输出合并为一次发出"""
+        result = self.current.poll()
+        # 输出洪水时一批可能很大，由 OutputView 只保留末尾部分
+        chunks = self.current.read_output()
+        if chunks:
+            self.output.emit(chunks)
+            if self.memo_key is not None:
+                self._capture(chunks)
+        if result is None:
+            self.progress.emit(self.current.progress_text())
+        else:
+            self._finish(result)
+
+    def _capture(self, chunks):
+        """记录输出以便写入结果缓存，输出过多时放弃缓存本次结果"""
+        self.memo_chunks.extend(chunks)
+        self.memo_size += sum(len(text) for _, text in chunks)
+        if self.memo_size > self.memo.max_bytes // 4:
+            self.memo_key, self.memo_chunks = None, []
+
+    def _finish(self, result):
+        self.poll_timer.stop()
+        self.current = None
+        if self.memo_key is not None:
+            # 只缓存成功的执行，出错、超时或被停止的结果可能与环境有关
+            if result.get('ok'):
+                self.memo.put(self.memo_key, {
+                    'chunks': self.memo_chunks,
+                    'result': {k: v for k, v in result.items() if k != 'variables'},
+                })
+            self.memo_key, self.memo_chunks = None, []
+        self.finished.emit(result)
+
+    def shutdown(self):
+        """停止执行并关闭进程池"""
+        self.stop()
+        self.pool.shutdown()
+
+
+class ExecutionServer(QObject):
+    """本地执行服务：其他程序通过本地套接字（Windows 上为命名管道）提交代码，
+    在常驻执行进程中运行，以 JSON 返回输出、结果和耗时
+
+    每个连接发送一行 JSON 请求 {"code": "...", "inputs": {"x": "5"}, "timeout": 秒}，
+    收到一行 JSON 回复后连接关闭。inputs 中的文本按输入框的规则解析，其他 JSON 值原样传入；
+    代码中名为 result 的变量的 repr 放在回复的 value 字段。
+
+    同一个端点也用于单实例：再次启动程序时发送 {"command": "show", "file": 路径}，
+    由 show_requested 信号通知窗口。allow_run 为 False 时只接受这类命令，不执行代码。
+    """
+    MAX_REQUEST = 16 * 1024 * 1024  # 单个请求的大小上限（字节）
+    show_requested = Signal(str)  # 要打开的文件路径，空字符串表示只显示窗口
+
+    def __init__(self, pool, config, allow_run=False, parent=None):
+        super().__init__(parent)
+        self.pool = pool
+        self.config = config
+        self.allow_run = allow_run
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)
+        self.server.newConnection.connect(self._on_new_connection)
+        self.buffers = {}  # 连接 -> 尚未收完的请求
+        self.runs = []  # [(连接, PoolRun, 已收到的输出片段), ...]
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(30)
+        self.poll_timer.timeout.connect(self._poll)
+
+    def start(self, name):
+        """开始监听，返回是否成功；同名服务已在运行（如另一个实例）时不抢占"""
+        address = server_address(name)
+        probe = QLocalSocket()
+        probe.connectToServer(address)
+        if probe.waitForConnected(200):
+            probe.abort()
+            return False
+        # 清理上次异常退出时残留的套接字文件
+        QLocalServer.removeServer(address)
+        if sys.platform != 'win32':
+            os.makedirs(os.path.dirname(address), exist_ok=True)
+        return self.server.listen(address)
+
+    def stop(self):
+        """停止监听并终止尚未完成的执行"""
+        self.server.close()
+        self.poll_timer.stop()
+        for _, run, _ in self.runs:
+            run.terminate()
+        self.runs.clear()
+
+    def _on_new_connection(self):
+        while self.server.hasPendingConnections():
+            connection = self.server.nextPendingConnection()
+            self.buffers[connection] = b""
+            connection.readyRead.connect(lambda c=connection: self._on_ready_read(c))
+            connection.disconnected.connect(lambda c=connection: self._on_disconnected(c))
+
+    def _on_ready_read(self, connection):
+        if connection not in self.buffers:
+            return  # 已收到完整请求，忽略多余的数据
+        data = self.buffers[connection] + bytes(connection.readAll())
+        line, newline, _ = data.partition(b"\n")
+        if not newline:
+            if len(data) > self.MAX_REQUEST:
+                del self.buffers[connection]
+                self._reply(connection, {'ok': False, 'error': "请求过大"})
+            else:
+                self.buffers[connection] = data
+            return
+        del self.buffers[connection]
+        self._handle(connection, line)
+
+    def _handle(self, connection, line):
+        """解析请求并提交执行"""
+        try:
+            request = json.loads(line)
+            if isinstance(request, dict) and request.get('command') == 'show':
+                self.show_requested.emit(str(request.get('file') or ""))
+                self._reply(connection, {'ok': True})
+                return
+            if not self.allow_run:
+                self._reply(connection, {'ok': False, 'error': "本地执行服务未开启（配置 server_enabled）"})
+                return
+            if not isinstance(request, dict) or not isinstance(request.get('code'), str):
+                raise InputError("请求应为包含 code 字段的 JSON 对象")
+            inputs = request.get('inputs') or {}
+            if not isinstance(inputs, dict):
+                raise InputError("inputs 应为 {变量名: 值} 形式的对象")
+            for name in inputs:
+                if not name.isidentifier():
+                    raise InputError(f"无效的变量名：{name}")
+            variables = parse_inputs((name, value) for name, value in inputs.items() if isinstance(value, str))
+            variables.update({name: value for name, value in inputs.items() if not isinstance(value, str)})
+            timeout = float(request.get('timeout', self.config.get("timeout", 0)))
+        except (ValueError, TypeError) as e:
+            # json.JSONDecodeError 和 InputError 都是 ValueError
+            self._reply(connection, {'ok': False, 'error': f"无效的请求：{e}"})
+            return
+
+        run = self.pool.run(request['code'], variables, timeout, result_name='result')
+        self.runs.append((connection, run, []))
+        self.poll_timer.start()
+
+    def _poll(self):
+        for entry in list(self.runs):
+            connection, run, chunks = entry
+            result = run.poll()
+            chunks.extend(run.read_output())
+            if result is None:
+                continue
+            self.runs.remove(entry)
+            result['output'] = ''.join(text for _, text in chunks) + result.get('output', '')
+            self._reply(connection, result)
+        if not self.runs:
+            self.poll_timer.stop()
+
+    def _reply(self, connection, reply):
+        connection.write(json.dumps(reply, ensure_ascii=False).encode('utf-8') + b"\n")
+        # 待发送的数据写完后才会真正断开
+        connection.disconnectFromServer()
+
+    def _on_disconnected(self, connection):
+        self.buffers.pop(connection, None)
+        # 客户端提前断开时终止它提交的执行
+        for entry in [e for e in self.runs if e[0] is connection]:
+            entry[1].terminate()
+            self.runs.remove(entry)
+        connection.deleteLater()
+
+
+# 整个程序共用一份样式表，设置在 QApplication 上只解析一次；
+# 控件用 objectName 或动态属性 role 选择样式，切换状态时只改属性并重新 polish
+APP_STYLE = """
+    QMainWindow, QWidget {
+        background-color: #1e1e1e;
+        color: #d4d4d4;
+    }
+    QToolTip {
+        border: 1px solid #3c3c3c;
+    }
+    QScrollBar:vertical {
+        background-color: #1e1e1e;
+        width: 14px;
+        border: none;
+        border-radius: 7px;
+        margin: 0px;
+    }
+    QScrollBar::handle:vertical {
+        background-color: #424242;
+        border-radius: 7px;
+        min-height: 30px;
+    }
+    QScrollBar:horizontal {
+        background-color: #1e1e1e;
+        height: 14px;
+        border: none;
+        border-radius: 7px;
+        margin: 0px;
+    }
+    QScrollBar::handle:horizontal {
+        background-color: #424242;
+        border-radius: 7px;
+        min-width: 30px;
+    }
+    QScrollBar::handle:vertical:hover, QScrollBar::handle:horizontal:hover {
+        background-color: #4e4e4e;
+    }
+    QScrollBar::handle:vertical:pressed, QScrollBar::handle:horizontal:pressed {
+        background-color: #595959;
+    }
+    QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
+        height: 0px;
+    }
+    QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal {
+        width: 0px;
+    }
+    QScrollBar::add-page, QScrollBar::sub-page {
+        background: none;
+    }
+
+    QLabel[role="heading"] {
+        font-weight: bold;
+        font-size: 10pt;
+        color: #569cd6;
+        margin-bottom: 5px;
+    }
+    QLabel[role="var"] {
+        color: #d4d4d4;
+        font-weight: bold;
+    }
+    QLabel[role="summary"] {
+        color: #dcdcaa;
+    }
+    QLabel#statusLabel {
+        color: #dcdcaa;
+        font-size: 9pt;
+    }
+
+    QLineEdit[role="input"] {
+        background-color: #2d2d30;
+        color: #d4d4d4;
+        border: 1px solid #3c3c3c;
+        border-radius: 4px;
+        padding: 4px 8px;
+        font-family: 'Consolas', 'Monaco', 'Courier New', monospace;
+    }
+    QLineEdit[role="input"]:focus {
+        border-color: #007acc;
+        background-color: #1e1e1e;
+    }
+    QLineEdit[role="input"]:hover {
+        border-color: #5a5a5a;
+    }
+
+    QPlainTextEdit {
+        background-color: #1e1e1e;
+        color: #d4d4d4;
+        border: 1px solid #3c3c3c;
+        border-radius: 4px;
+        padding: 8px;
+        font-family: 'Consolas', 'Monaco', 'Courier New', monospace;
+        line-height: 1.4;
+    }
+    QPlainTextEdit#codeEditor:focus {
+        border-color: #007acc;
+    }
+
+    QSplitter::handle {
+        background-color: #3c3c3c;
+        margin: 2px 0px;
+    }
+    QSplitter::handle:hover {
+        background-color: #007acc;
+    }
+
+    QPushButton[role="add"], QPushButton[role="remove"] {
+        color: white;
+        font-size: 12pt;
+        font-weight: bold;
+        border-radius: 4px;
+    }
+    QPushButton[role="add"] {
+        background-color: #0e639c;
+        border: 1px solid #007acc;
+    }
+    QPushButton[role="add"]:hover {
+        background-color: #1177bb;
+        border-color: #0099ff;
+    }
+    QPushButton[role="add"]:pressed {
+        background-color: #0d5a8a;
+    }
+    QPushButton[role="remove"] {
+        background-color: #d73a49;
+        border: 1px solid #f85149;
+    }
+    QPushButton[role="remove"]:hover {
+        background-color: #e5534b;
+        border-color: #ff6b6b;
+    }
+    QPushButton[role="remove"]:pressed {
+        background-color: #c5302f;
+    }
+
+    QPushButton[role="run"], QPushButton[role="stop"], QPushButton[role="clear"], QPushButton[role="topmost"] {
+        color: white;
+        padding: 8px 16px;
+        font-size: 10pt;
+        font-weight: bold;
+        border-radius: 4px;
+        min-width: 45px;
+    }
+    QPushButton[role="run"], QPushButton[role="mode"] {
+        background-color: #28a745;
+        border: 1px solid #28a745;
+    }
+    QPushButton[role="run"]:hover, QPushButton[role="mode"]:hover {
+        background-color: #218838;
+        border-color: #1e7e34;
+    }
+    QPushButton[role="run"]:pressed {
+        background-color: #1e7e34;
+    }
+    QPushButton[role="mode"] {
+        color: white;
+        padding: 8px 4px;
+        border-radius: 4px;
+    }
+    QPushButton[role="mode"]::menu-indicator {
+        subcontrol-position: center;
+    }
+    QPushButton[role="stop"], QPushButton[role="topmost"][active="true"] {
+        background-color: #ff6b35;
+        border: 1px solid #ff6b35;
+    }
+    QPushButton[role="stop"]:hover, QPushButton[role="topmost"][active="true"]:hover {
+        background-color: #ff5722;
+        border-color: #ff5722;
+    }
+    QPushButton[role="stop"]:pressed, QPushButton[role="topmost"][active="true"]:pressed {
+        background-color: #e64a19;
+    }
+    QPushButton[role="clear"] {
+        background-color: #dc3545;
+        border: 1px solid #dc3545;
+    }
+    QPushButton[role="clear"]:hover {
+        background-color: #c82333;
+        border-color: #bd2130;
+    }
+    QPushButton[role="clear"]:pressed {
+        background-color: #bd2130;
+    }
+    QPushButton[role="topmost"] {
+        background-color: #007bff;
+        border: 1px solid #007bff;
+    }
+    QPushButton[role="topmost"]:hover {
+        background-color: #0056b3;
+        border-color: #004085;
+    }
+    QPushButton[role="topmost"]:pressed {
+        background-color: #004085;
+    }
+
+    QTableView {
+        background-color: #1e1e1e;
+        color: #d4d4d4;
+        gridline-color: #3c3c3c;
+        border: 1px solid #3c3c3c;
+    }
+    QHeaderView::section {
+        background-color: #2d2d30;
+        color: #d4d4d4;
+        border: none;
+        padding: 4px;
+    }
+"""
+
+
+class SweepTableModel(QAbstractTableModel):
+    """批量执行结果表，支持按列排序"""
+    def __init__(self, names, points, rows, parent=None):
+        super().__init__(parent)
+        self.names = names
+        self.points = points
+        self.rows = rows
+        self.headers = names + ["result", "输出", "错误", "耗时 (ms)"]
+        self.order = list(range(len(rows)))  # 显示顺序 -> 原始下标
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.order)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.headers[section]
+        return str(section + 1)
+
+    def cell(self, row, column):
+        """原始下标 row 第 column 列的值"""
+        if column < len(self.names):
+            return self.points[row][self.names[column]]
+        result = self.rows[row]
+        key = column - len(self.names)
+        if key == 0:
+            return result.get('value') or ''
+        if key == 1:
+            return result.get('output', '').strip().replace('\n', ' ⏎ ')
+        if key == 2:
+            return result.get('error', '')
+        return result.get('elapsed', 0.0) * 1000
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        value = self.cell(self.order[index.row()], index.column())
+        if role == Qt.DisplayRole:
+            return f"{value:.4g}" if isinstance(value, float) else value
+        if role == Qt.ForegroundRole and self.rows[self.order[index.row()]].get('error'):
+            return QColor("#f48771")
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if column < 0:
+            # 取消排序时恢复网格顺序
+            self.layoutAboutToBeChanged.emit()
+            self.order.sort()
+            self.layoutChanged.emit()
+            return
+
+        def key(row):
+            value = self.cell(row, column)
+            # 能转换为数字的按数值排序，其余按文本排序
+            try:
+                return (0, float(value), '')
+            except (TypeError, ValueError):
+                return (1, 0.0, str(value))
+
+        self.layoutAboutToBeChanged.emit()
+        self.order.sort(key=key, reverse=order == Qt.DescendingOrder)
+        self.layoutChanged.emit()
+
+
+class SweepDialog(QDialog):
+    """批量执行结果窗口：结果表、汇总信息和 CSV 导出"""
+    def __init__(self, result, parent=None):
+        super().__init__(parent)
+        self.result = result
+        self.setWindowTitle("批量执行结果")
+        self.resize(640, 420)
+
+        layout = QVBoxLayout(self)
+        summary = QLabel(format_sweep_stats(result['stats']))
+        summary.setWordWrap(True)
+        summary.setProperty("role", "summary")
+        layout.addWidget(summary)
+
+        self.model = SweepTableModel(result['names'], result['points'], result['rows'], self)
+        table = QTableView()
+        table.setModel(self.model)
+        table.setSortingEnabled(True)
+        table.sortByColumn(-1, Qt.AscendingOrder)  # 初始保持网格顺序
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        table.horizontalHeader().setStretchLastSection(True)
+        table.verticalHeader().setDefaultSectionSize(22)
+        layout.addWidget(table)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        export_button = QPushButton("💾 导出 CSV")
+        export_button.clicked.connect(self.export_csv)
+        button_layout.addWidget(export_button)
+        layout.addLayout(button_layout)
+
+    def export_csv(self):
+        """把结果导出为 CSV 文件"""
+        path, _ = QFileDialog.getSaveFileName(self, "导出批量结果", "sweep.csv", "CSV 文件 (*.csv)")
+        if not path:
+            return
+        try:
+            with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+                write_sweep_csv(f, self.result['names'], self.result['points'], self.result['rows'])
+        except OSError as e:
+            self.setWindowTitle(f"批量执行结果 - 导出失败：{e.strerror}")
+
+
+class NumericItem(QTableWidgetItem):
+    """显示格式化文本、按数值排序的单元格"""
+    def __init__(self, text, value):
+        super().__init__(text)
+        self.setData(Qt.UserRole, value)
+        self.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+
+    def __lt__(self, other):
+        return self.data(Qt.UserRole) < other.data(Qt.UserRole)
+
+
+class VariablesDialog(QDialog):
+    """会话变量窗口：名称、类型、估算大小和值的摘要"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("会话变量")
+        self.resize(520, 360)
+
+        layout = QVBoxLayout(self)
+        self.summary = QLabel()
+        self.summary.setProperty("role", "summary")
+        layout.addWidget(self.summary)
+
+        self.table = QTableWidget(0, 4)
+        self.table.setHorizontalHeaderLabels(["名称", "类型", "大小", "值"])
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.verticalHeader().setDefaultSectionSize(22)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table)
+        self.set_variables([])
+
+    def set_variables(self, variables):
+        """用执行进程返回的变量列表刷新表格"""
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(variables))
+        for row, var in enumerate(variables):
+            self.table.setItem(row, 0, QTableWidgetItem(var['name']))
+            self.table.setItem(row, 1, QTableWidgetItem(var['type']))
+            self.table.setItem(row, 2, NumericItem(format_size(var['size']), var['size']))
+            self.table.setItem(row, 3, QTableWidgetItem(var['value']))
+        self.table.resizeColumnsToContents()
+        self.table.setSortingEnabled(True)
+        total = sum(var['size'] for var in variables)
+        self.summary.setText(f"共 {len(variables)} 个变量，约 {format_size(total)}")
+
+
+class HistoryDialog(QDialog):
+    """最近若干次执行的耗时、CPU 时间和峰值内存，便于发现性能回退"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("执行历史")
+        self.resize(600, 320)
+
+        layout = QVBoxLayout(self)
+        self.table = QTableWidget(0, 6)
+        self.table.setHorizontalHeaderLabels(["时间", "墙钟 (ms)", "CPU (ms)", "峰值内存", "结果", "代码"])
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.verticalHeader().setDefaultSectionSize(22)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table)
+
+    def set_history(self, history):
+        """用执行历史刷新表格，最近的一次在最上面"""
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(history))
+        for row, entry in enumerate(reversed(history)):
+            peak = entry['peak_memory']
+            self.table.setItem(row, 0, QTableWidgetItem(entry['time']))
+            self.table.setItem(row, 1, NumericItem(f"{entry['elapsed'] * 1000:.2f}", entry['elapsed']))
+            self.table.setItem(row, 2, NumericItem(f"{entry['cpu'] * 1000:.2f}", entry['cpu']))
+            self.table.setItem(row, 3, NumericItem("—" if peak is None else format_size(peak), peak or 0))
+            self.table.setItem(row, 4, QTableWidgetItem("✓" if entry['ok'] else "❌"))
+            self.table.setItem(row, 5, QTableWidgetItem(entry['label']))
+        self.table.resizeColumnsToContents()
+        self.table.setSortingEnabled(True)
+
+
+class ImportReportDialog(QDialog):
+    """预导入模块的导入耗时：按 python -X importtime 的方式逐级展开，可按自身或累计耗时排序"""
+    COLUMNS = ["模块", "自身 (ms)", "累计 (ms)"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("模块导入耗时")
+        self.resize(520, 420)
+
+        layout = QVBoxLayout(self)
+        self.summary = QLabel()
+        self.summary.setWordWrap(True)
+        self.summary.setProperty("role", "summary")
+        layout.addWidget(self.summary)
+
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(self.COLUMNS)
+        self.tree.setSortingEnabled(True)
+        header = self.tree.header()
+        header.setStretchLastSection(False)
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        layout.addWidget(self.tree)
+
+    def set_report(self, report, modules):
+        """显示执行进程返回的报告；report 为 None 表示尚未预导入"""
+        self.tree.clear()
+        if report is None:
+            if modules:
+                self.summary.setText(f"尚未完成预导入（{', '.join(modules)}），界面空闲片刻后会在后台进行")
+            else:
+                self.summary.setText("未配置预导入模块：在配置文件的 preload_modules 中列出模块（如 [\"numpy\", \"pandas\"]），"
+                                     "启动后会在后台导入并在这里列出耗时")
+            return
+
+        # 记录按完成顺序排列，父模块在其全部子模块之后，用栈把子模块挂到父模块下
+        pending = {}  # 深度 -> 等待父模块认领的节点
+        for depth, name, own, total in report['records']:
+            item = NumericTreeItem([name, f"{own * 1000:.2f}", f"{total * 1000:.2f}"])
+            item.setData(1, Qt.UserRole, own)
+            item.setData(2, Qt.UserRole, total)
+            item.setTextAlignment(1, Qt.AlignRight | Qt.AlignVCenter)
+            item.setTextAlignment(2, Qt.AlignRight | Qt.AlignVCenter)
+            item.addChildren(pending.pop(depth + 1, []))
+            pending.setdefault(depth, []).append(item)
+        self.tree.addTopLevelItems(pending.get(0, []))
+        self.tree.sortItems(2, Qt.DescendingOrder)
+
+        total = sum(m['elapsed'] for m in report['modules'])
+        text = f"预导入 {len(report['modules'])} 个模块共 {format_duration(total)}，涉及 {len(report['records'])} 个模块（执行进程 {report['pid']}）"
+        failed = [f"{m['name']}（{m['error']}）" for m in report['modules'] if m['error']]
+        if failed:
+            text += "\n❌ 导入失败：" + "；".join(failed)
+        self.summary.setText(text)
+
+
+class ProfileGutter(QWidget):
+    """代码编辑器左侧的逐行性能热度栏：底色越红耗时越多，并标出每行耗时
+
+    编辑代码后行号不再对应，热度栏自动清除。
+    """
+    def __init__(self, editor):
+        super().__init__(editor)
+        self.editor = editor
+        self.stats = {}  # 行号（从 1 开始）-> (次数, 耗时)
+        self.max_time = 0.0
+        self.total_time = 0.0
+        self.revision = -1  # 收集数据时文档的版本号
+        self.setFont(QFont("Consolas", 8))
+        self.setVisible(False)
+        editor.updateRequest.connect(self._on_update_request)
+        editor.textChanged.connect(self._on_text_changed)
+        editor.installEventFilter(self)
+
+    def set_stats(self, rows):
+        """显示 [(行号, 次数, 耗时), ...]"""
+        self.stats = {line: (hits, spent) for line, hits, spent in rows}
+        self.max_time = max((spent for _, spent in self.stats.values()), default=0.0)
+        self.total_time = sum(spent for _, spent in self.stats.values())
+        self.revision = self.editor.document().revision()
+        self.setVisible(bool(self.stats))
+        self._update_geometry()
+        self.update()
+
+    def clear(self):
+        if self.stats:
+            self.set_stats([])
+
+    def _on_text_changed(self):
+        # 语法高亮只改格式不改版本号，只有真正的编辑才清除
+        if self.stats and self.editor.document().revision() != self.revision:
+            self.clear()
+
+    def _update_geometry(self):
+        width = self.fontMetrics().horizontalAdvance("999 ms ×9999999") + 10 if self.isVisible() else 0
+        self.editor.setViewportMargins(width, 0, 0, 0)
+        rect = self.editor.contentsRect()
+        self.setGeometry(rect.left(), rect.top(), width, rect.height())
+
+    def eventFilter(self, obj, event):
+        if obj is self.editor and event.type() == QEvent.Resize and self.isVisible():
+            self._update_geometry()
+        return False
+
+    def _on_update_request(self, rect, dy):
+        if not self.isVisible():
+            return
+        if dy:
+            self.scroll(0, dy)
+        else:
+            self.update(0, rect.y(), self.width(), rect.height())
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), QColor("#252526"))
+        block = self.editor.firstVisibleBlock()
+        offset = self.editor.contentOffset()
+        while block.isValid():
+            rect = self.editor.blockBoundingGeometry(block).translated(offset)
+            if rect.top() > event.rect().bottom():
+                break
+            entry = self.stats.get(block.blockNumber() + 1)
+            if entry and block.isVisible():
+                hits, spent = entry
+                ratio = spent / self.max_time if self.max_time else 0.0
+                row = QRectF(0, rect.top(), self.width(), rect.height())
+                painter.fillRect(row, QColor(241, 76, 76, int(30 + 190 * ratio)))
+                painter.setPen(QColor("#ffffff" if ratio > 0.5 else "#d4d4d4"))
+                painter.drawText(
+                    row.adjusted(2, 0, -4, 0), Qt.AlignRight | Qt.AlignVCenter,
+                    f"{format_duration(spent)} ×{hits}"
+                )
+            block = block.next()
+
+    def event(self, event):
+        if event.type() == QEvent.ToolTip:
+            line = self.editor.cursorForPosition(QPoint(0, event.pos().y())).blockNumber() + 1
+            entry = self.stats.get(line)
+            if entry:
+                hits, spent = entry
+                share = spent / self.total_time if self.total_time else 0.0
+                QToolTip.showText(
+                    event.globalPos(),
+                    f"第 {line} 行：执行 {hits:,} 次，共 {format_duration(spent)}（占 {share:.1%}），"
+                    f"每次 {format_duration(spent / hits)}"
+                )
+            else:
+                QToolTip.hideText()
+            return True
+        return super().event(event)
+
+
+class SyntaxChecker(QObject):
+    """后台语法检查：编辑停顿后把代码交给语法检查进程编译，在出错位置画红色波浪线，悬停显示错误
+
+    工作线程只等待检查进程的结果，编译不占用界面进程的 GIL，大文件输入时也不会卡顿；
+    检查进程在第一次检查时启动。最近检查过的文本直接复用结果（如撤销/重做）。
+    """
+    CACHE_SIZE = 8
+    checked = Signal(str, object)  # (源码, 错误或 None)，由工作线程发出
+
+    def __init__(self, editor, delay=300):
+        super().__init__(editor)
+        self.editor = editor
+        self.results = OrderedDict()  # 源码 -> 错误或 None，只在界面线程访问
+        self.shown_code = None  # 当前显示的结果对应的源码
+        self.error = None
+        self.error_line = 0
+        self.pending = None  # 等待工作线程检查的源码，只保留最新的一份
+        self.condition = threading.Condition()
+        self.process = SyntaxCheckProcess()  # 只在工作线程中使用
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.check)
+        editor.textChanged.connect(self._on_text_changed)
+        editor.viewport().installEventFilter(self)
+        self.checked.connect(self._on_checked)
+
+        threading.Thread(target=self._worker, name="syntax-check", daemon=True).start()
+
+    def _on_text_changed(self):
+        # 语法高亮也会发出 textChanged；这里只重启计时，文本是否变化留到检查时再比较
+        self.timer.start()
+
+    def check(self):
+        """检查编辑器中的当前代码"""
+        code = self.editor.toPlainText()
+        if code == self.shown_code:
+            return
+        if code in self.results:
+            self.results.move_to_end(code)
+            self._show(code, self.results[code])
+            return
+        with self.condition:
+            self.pending = code
+            self.condition.notify()
+
+    def _worker(self):
+        while True:
+            with self.condition:
+                while self.pending is None:
+                    self.condition.wait()
+                code, self.pending = self.pending, None
+            try:
+                self.checked.emit(code, self.process.check(code))
+            except RuntimeError:
+                # 窗口已销毁
+                return
+
+    def _on_checked(self, code, error):
+        self.results[code] = error
+        while len(self.results) > self.CACHE_SIZE:
+            self.results.popitem(last=False)
+        # 检查期间文本可能又变了，旧结果的行号已不可靠
+        if code == self.editor.toPlainText():
+            self._show(code, error)
+
+    def _show(self, code, error):
+        """在出错位置画波浪线；没有错误时清除"""
+        self.shown_code = code
+        self.error = error
+        if error is None:
+            self.error_line = 0
+            self.editor.setExtraSelections([])
+            return
+
+        document = self.editor.document()
+        # 文件意外结束的错误可能指向最后一行之后
+        block = document.findBlockByNumber(min(error['line'], document.blockCount()) - 1)
+        self.error_line = block.blockNumber() + 1
+        length = block.length() - 1
+        start = min(max(error['col'] - 1, 0), length)
+        end = length
+        if error['end_line'] == error['line'] and error['end_col'] and error['end_col'] - 1 > start:
+            end = min(error['end_col'] - 1, length)
+        if start >= end:
+            # 位置落在行尾：标出整行，空行至少标一个字符
+            start, end = 0, max(length, 1)
+
+        cursor = QTextCursor(block)
+        cursor.setPosition(block.position() + start)
+        cursor.setPosition(min(block.position() + end, document.characterCount() - 1), QTextCursor.KeepAnchor)
+        selection = QTextEdit.ExtraSelection()
+        selection.cursor = cursor
+        selection.format.setUnderlineStyle(QTextCharFormat.WaveUnderline)
+        selection.format.setUnderlineColor(QColor("#f14c4c"))
+        self.editor.setExtraSelections([selection])
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.ToolTip and self.error is not None:
+            line = self.editor.cursorForPosition(event.pos()).blockNumber() + 1
+            if line == self.error_line:
+                QToolTip.showText(event.globalPos(), f"第 {line} 行：{self.error['message']}", self.editor)
+                return True
+        return False
+
+
+class LineProfileDialog(QDialog):
+    """逐行性能分析的耗时排行（前 N 行），双击跳转到对应代码行"""
+    def __init__(self, rows, code, top_n, backend, jump_to_line, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("逐行性能分析")
+        self.resize(640, 400)
+        self.jump_to_line = jump_to_line
+
+        layout = QVBoxLayout(self)
+        total = sum(spent for _, _, spent in rows)
+        top = sorted(rows, key=lambda row: row[2], reverse=True)[:top_n]
+        summary = QLabel(f"共 {len(rows)} 行被执行，总耗时 {format_duration(total)}，显示耗时最多的 {len(top)} 行（{backend}）")
+        summary.setProperty("role", "summary")
+        layout.addWidget(summary)
+
+        lines = code.splitlines()
+        self.table = QTableWidget(len(top), 6)
+        self.table.setHorizontalHeaderLabels(["行", "次数", "耗时", "占比", "每次", "代码"])
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.table.verticalHeader().setDefaultSectionSize(22)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        for row, (line, hits, spent) in enumerate(top):
+            share = spent / total if total else 0.0
+            self.table.setItem(row, 0, NumericItem(str(line), line))
+            self.table.setItem(row, 1, NumericItem(f"{hits:,}", hits))
+            self.table.setItem(row, 2, NumericItem(format_duration(spent), spent))
+            self.table.setItem(row, 3, NumericItem(f"{share:.1%}", share))
+            self.table.setItem(row, 4, NumericItem(format_duration(spent / hits), spent / hits))
+            self.table.setItem(row, 5, QTableWidgetItem(lines[line - 1].strip() if line <= len(lines) else ""))
+        self.table.resizeColumnsToContents()
+        self.table.setSortingEnabled(True)
+        self.table.sortItems(2, Qt.DescendingOrder)
+        self.table.cellDoubleClicked.connect(self._on_double_click)
+        layout.addWidget(self.table)
+
+    def _on_double_click(self, row, column):
+        self.jump_to_line(self.table.item(row, 0).data(Qt.UserRole))
+
+
+class NumericTreeItem(QTreeWidgetItem):
+    """除第一列外按 UserRole 中的数值排序的树节点"""
+    def __lt__(self, other):
+        column = self.treeWidget().sortColumn() if self.treeWidget() else 0
+        if column == 0:
+            return self.text(0) < other.text(0)
+        return (self.data(column, Qt.UserRole) or 0) < (other.data(column, Qt.UserRole) or 0)
+
+
+class CallProfilePanel(QDockWidget):
+    """cProfile 结果侧栏：可展开的调用树和可排序的函数列表，支持导出 .pstats 和折叠栈"""
+    COLUMNS = ["函数", "调用次数", "累计耗时", "自身耗时", "每次（累计）"]
+
+    def __init__(self, parent=None):
+        super().__init__("函数调用分析", parent)
+        self.setObjectName("call_profile_panel")
+        self.stats = {}
+        self.children = {}
+        self.summary_text = ""
+
+        container = QWidget()
+        layout = QVBoxLayout(container)
+        layout.setContentsMargins(4, 4, 4, 4)
+        self.summary = QLabel()
+        self.summary.setWordWrap(True)
+        self.summary.setProperty("role", "summary")
+        layout.addWidget(self.summary)
+
+        self.tabs = QTabWidget()
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(self.COLUMNS)
+        self.tree.setSortingEnabled(True)
+        self.tree.itemExpanded.connect(self._populate)
+        self.tabs.addTab(self.tree, "调用树")
+
+        self.table = QTableWidget(0, 5)
+        self.table.setHorizontalHeaderLabels(["函数", "调用次数", "累计耗时", "自身耗时", "每次（自身）"])
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.verticalHeader().setDefaultSectionSize(22)
+        self.tabs.addTab(self.table, "函数列表")
+        layout.addWidget(self.tabs)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        pstats_button = QPushButton("💾 导出 .pstats")
+        pstats_button.clicked.connect(self.export_pstats)
+        button_layout.addWidget(pstats_button)
+        stacks_button = QPushButton("💾 导出折叠栈")
+        stacks_button.setToolTip("每行一条调用栈及其耗时（微秒），可用 flamegraph.pl、speedscope 等生成火焰图")
+        stacks_button.clicked.connect(self.export_collapsed)
+        button_layout.addWidget(stacks_button)
+        layout.addLayout(button_layout)
+        self.setWidget(container)
+
+    def set_stats(self, stats):
+        """显示一次 cProfile 执行的调用统计"""
+        self.stats = stats
+        self.children = call_graph(stats)
+        total_calls = sum(entry[1] for entry in stats.values())
+        roots = call_roots(stats)
+        total_time = max((stats[root][3] for root in roots), default=0.0)
+        self.summary_text = f"共 {len(stats)} 个函数，{total_calls:,} 次调用，总耗时 {format_duration(total_time)}"
+        self.summary.setText(self.summary_text)
+
+        self.tree.setSortingEnabled(False)
+        self.tree.clear()
+        for root in roots:
+            cc, nc, tt, ct, callers = stats[root]
+            self.tree.addTopLevelItem(self._make_item(root, nc, tt, ct))
+        self.tree.setSortingEnabled(True)
+        self.tree.sortItems(2, Qt.DescendingOrder)
+        for index in range(self.tree.topLevelItemCount()):
+            self.tree.topLevelItem(index).setExpanded(True)
+        self.tree.resizeColumnToContents(0)
+
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(stats))
+        for row, (func, (cc, nc, tt, ct, callers)) in enumerate(stats.items()):
+            self.table.setItem(row, 0, QTableWidgetItem(func_label(func)))
+            self.table.setItem(row, 1, NumericItem(f"{nc:,}" if nc == cc else f"{nc:,}/{cc:,}", nc))
+            self.table.setItem(row, 2, NumericItem(format_duration(ct), ct))
+            self.table.setItem(row, 3, NumericItem(format_duration(tt), tt))
+            self.table.setItem(row, 4, NumericItem(format_duration(tt / nc) if nc else "—", tt / nc if nc else 0.0))
+        self.table.resizeColumnsToContents()
+        self.table.setSortingEnabled(True)
+        self.table.sortItems(3, Qt.DescendingOrder)
+
+    def _make_item(self, func, calls, tt, ct):
+        item = NumericTreeItem([func_label(func), f"{calls:,}", format_duration(ct), format_duration(tt),
+                                format_duration(ct / calls) if calls else "—"])
+        for column, value in ((1, calls), (2, ct), (3, tt), (4, ct / calls if calls else 0.0)):
+            item.setData(column, Qt.UserRole, value)
+            item.setTextAlignment(column, Qt.AlignRight | Qt.AlignVCenter)
+        item.setData(0, Qt.UserRole, func)
+        if self.children.get(func):
+            item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+        return item
+
+    def _populate(self, item):
+        """展开时才创建子节点，递归调用也不会无限展开"""
+        if item.childCount():
+            return
+        func = item.data(0, Qt.UserRole)
+        for child, (nc, cc, tt, ct) in self.children.get(func, ()):
+            item.addChild(self._make_item(child, nc, tt, ct))
+
+    def export_pstats(self):
+        """导出为 pstats 文件"""
+        path, _ = QFileDialog.getSaveFileName(self, "导出 .pstats", "profile.pstats", "pstats 文件 (*.pstats *.prof)")
+        if path:
+            self._export(path, lambda: write_pstats(path, self.stats))
+
+    def export_collapsed(self):
+        """导出为折叠栈文本"""
+        path, _ = QFileDialog.getSaveFileName(self, "导出折叠栈", "profile.folded", "折叠栈 (*.folded *.txt)")
+        if path:
+            def write():
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(collapsed_stacks(self.stats))
+            self._export(path, write)
+
+    def _export(self, path, write):
+        try:
+            write()
+            self.summary.setText(f"{self.summary_text}\n✓ 已导出到 {path}")
+        except (OSError, ValueError) as e:
+            self.summary.setText(f"{self.summary_text}\n❌ 导出失败：{e}")
 
 
 class SidePython(QMainWindow):
@@ -119,8 +1529,58 @@ class SidePython(QMainWindow):
         self.var_names = []  # 存储变量名
         self.hotkey_id = 1  # 全局热键ID
         self.hotkey_registered = False  # 热键注册状态
+        self.config = load_config()  # 用户配置
+        self.run_has_output = False  # 本次执行是否已有输出
+        self.sweep_dialog = None  # 最近一次批量执行的结果窗口
+        self.session_mode = False  # 会话模式：各次执行共享命名空间
+        self.cells_mode = False  # 单元格模式：只重跑有变化的 # %% 单元格及其下游
+        self.session_vars = []  # 会话中的变量（最近一次会话执行后的快照）
+        self.variables_dialog = None
+        self.run_history = deque(maxlen=max(1, self.config.get("history_size", 20)))  # 最近若干次执行的统计
+        self.run_label = ""  # 本次执行代码的首行，用于执行历史
+        self.history_dialog = None
+        self.import_dialog = None
+        self.profile_code = ""  # 最近一次性能分析的代码
+        self.profile_dialog = None
+        self.call_profile_panel = None
+        self.memo_enabled = self.config.get("memo_enabled", False)  # 结果缓存
+        self.compile_hits = 0  # 编译缓存命中次数
+        self.compile_misses = 0  # 编译缓存未命中次数
+        self.auto_run = False  # 实时执行：编辑代码或输入后自动运行
+        self.auto_pending = False  # 会话中的执行结束后需要再运行一次最新代码
+        self.auto_skipped = False  # 手动启动的运行期间跳过了实时执行
+        self.auto_code = None  # 上次触发实时执行时的代码
+
+        # 实时执行的防抖定时器：连续编辑只在停顿后触发一次
+        self.auto_timer = QTimer(self)
+        self.auto_timer.setSingleShot(True)
+        self.auto_timer.setInterval(self.config.get("auto_run_delay_ms", 400))
+        self.auto_timer.timeout.connect(self.run_auto)
+
+        # 启动后空闲片刻再让执行进程预导入模块，避免与启动争抢 CPU
+        self.prewarm_timer = QTimer(self)
+        self.prewarm_timer.setSingleShot(True)
+        self.prewarm_timer.setInterval(self.config.get("prewarm_delay_ms", 2000))
+        self.prewarm_timer.timeout.connect(self.prewarm)
+
+        # 后台执行器
+        self.runner = CodeRunner(self.config, self)
+        self.runner.started.connect(self.on_run_started)
+        self.runner.progress.connect(self.on_run_progress)
+        self.runner.output.connect(self.on_run_output)
+        self.runner.finished.connect(self.on_run_finished)
+
+        # 本地服务：总是接受再次启动时转发来的“显示窗口”请求；
+        # 开启 server_enabled 后还接受执行请求，与界面共用常驻执行进程池
+        self.server = ExecutionServer(self.runner.pool, self.config, self.config.get("server_enabled", False), self)
+        self.server.show_requested.connect(self.on_show_requested)
+        if not self.server.start(self.config.get("server_name", "sidepython")):
+            print("本地服务启动失败，可能已有其他实例在运行")
+
+        self.icon = None  # 应用图标，首次使用时绘制
+        self.tray_icon = None  # 托盘图标，首帧绘制后再创建
+        self.startup_scheduled = False
         self.init_ui()
-        self.create_tray_icon()
 
     def init_ui(self):
         """初始化用户界面"""
@@ -129,66 +1589,6 @@ class SidePython(QMainWindow):
         self.setGeometry(100, 100, 280, 400)
         # self.setMinimumWidth(250)
         self.setMinimumHeight(300)
-        
-        # 设置VSCode风格的样式
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: #1e1e1e;
-                color: #d4d4d4;
-            }
-            QWidget {
-                background-color: #1e1e1e;
-                color: #d4d4d4;
-            }
-            QScrollBar:vertical {
-                background-color: #1e1e1e;
-                width: 14px;
-                border: none;
-                border-radius: 7px;
-                margin: 0px;
-            }
-            QScrollBar::handle:vertical {
-                background-color: #424242;
-                border-radius: 7px;
-                min-height: 30px;
-            }
-            QScrollBar::handle:vertical:hover {
-                background-color: #4e4e4e;
-            }
-            QScrollBar::handle:vertical:pressed {
-                background-color: #595959;
-            }
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-                height: 0px;
-            }
-            QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {
-                background: none;
-            }
-            QScrollBar:horizontal {
-                background-color: #1e1e1e;
-                height: 14px;
-                border: none;
-                border-radius: 7px;
-                margin: 0px;
-            }
-            QScrollBar::handle:horizontal {
-                background-color: #424242;
-                border-radius: 7px;
-                min-width: 30px;
-            }
-            QScrollBar::handle:horizontal:hover {
-                background-color: #4e4e4e;
-            }
-            QScrollBar::handle:horizontal:pressed {
-                background-color: #595959;
-            }
-            QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal {
-                width: 0px;
-            }
-            QScrollBar::add-page:horizontal, QScrollBar::sub-page:horizontal {
-                background: none;
-            }
-        """)
 
         # 创建中心部件
         central_widget = QWidget()
@@ -201,12 +1601,7 @@ class SidePython(QMainWindow):
 
         # 1. 输入区域容器
         input_container_label = QLabel("📥 输入数据：")
-        input_container_label.setStyleSheet("""
-            font-weight: bold; 
-            font-size: 10pt; 
-            color: #569cd6;
-            margin-bottom: 5px;
-        """)
+        input_container_label.setProperty("role", "heading")
         main_layout.addWidget(input_container_label)
 
         # 输入框容器布局（水平排列）
@@ -219,45 +1614,13 @@ class SidePython(QMainWindow):
         # 先创建按钮（但不添加到布局）
         self.add_btn = QPushButton("+")
         self.add_btn.setFixedSize(28, 28)
-        self.add_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #0e639c;
-                color: white;
-                border: 1px solid #007acc;
-                font-size: 12pt;
-                font-weight: bold;
-                border-radius: 4px;
-            }
-            QPushButton:hover {
-                background-color: #1177bb;
-                border-color: #0099ff;
-            }
-            QPushButton:pressed {
-                background-color: #0d5a8a;
-            }
-        """)
+        self.add_btn.setProperty("role", "add")
         self.add_btn.clicked.connect(self.add_input_field)
         self.input_layout.addWidget(self.add_btn)
 
         self.remove_btn = QPushButton("-")
         self.remove_btn.setFixedSize(28, 28)
-        self.remove_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #d73a49;
-                color: white;
-                border: 1px solid #f85149;
-                font-size: 12pt;
-                font-weight: bold;
-                border-radius: 4px;
-            }
-            QPushButton:hover {
-                background-color: #e5534b;
-                border-color: #ff6b6b;
-            }
-            QPushButton:pressed {
-                background-color: #c5302f;
-            }
-        """)
+        self.remove_btn.setProperty("role", "remove")
         self.remove_btn.clicked.connect(self.remove_last_input)
         self.input_layout.addWidget(self.remove_btn)
         self.remove_btn.setVisible(False)  # 初始隐藏
@@ -271,15 +1634,6 @@ class SidePython(QMainWindow):
         # 2. 创建可拖动调整大小的Splitter
         splitter = QSplitter(Qt.Vertical)
         splitter.setHandleWidth(6)
-        splitter.setStyleSheet("""
-            QSplitter::handle {
-                background-color: #3c3c3c;
-                margin: 2px 0px;
-            }
-            QSplitter::handle:hover {
-                background-color: #007acc;
-            }
-        """)
 
         # 代码编辑区域容器
         code_container = QWidget()
@@ -289,40 +1643,26 @@ class SidePython(QMainWindow):
         code_layout.setSpacing(5)
 
         code_label = QLabel("💻 Python 代码：")
-        code_label.setStyleSheet("""
-            font-weight: bold; 
-            font-size: 10pt; 
-            color: #569cd6;
-            margin-bottom: 5px;
-        """)
+        code_label.setProperty("role", "heading")
         code_layout.addWidget(code_label)
 
         self.code_editor = QPlainTextEdit()
+        self.code_editor.setObjectName("codeEditor")
         self.code_editor.setPlaceholderText("在此编写 Python 代码...")
         self.code_editor.setFont(QFont("Consolas", 10))
         self.code_editor.setMinimumHeight(20)  # 设置最小高度
         
-        # 设置VSCode风格的代码编辑器样式
-        self.code_editor.setStyleSheet("""
-            QPlainTextEdit {
-                background-color: #1e1e1e;
-                color: #d4d4d4;
-                border: 1px solid #3c3c3c;
-                border-radius: 4px;
-                padding: 8px;
-                font-family: 'Consolas', 'Monaco', 'Courier New', monospace;
-                line-height: 1.4;
-            }
-            QPlainTextEdit:focus {
-                border-color: #007acc;
-            }
-        """)
         
         # 设置Tab宽度为4个空格
         self.code_editor.setTabStopDistance(4 * self.code_editor.fontMetrics().horizontalAdvance(' '))
         
         # 添加语法高亮
-        self.highlighter = PythonSyntaxHighlighter(self.code_editor.document())
+        self.highlighter = PythonSyntaxHighlighter(self.code_editor.document(), self.code_editor)
+
+        # 逐行性能分析的热度栏
+        self.profile_gutter = ProfileGutter(self.code_editor)
+        self.code_editor.textChanged.connect(self.on_code_changed)
+        self.syntax_checker = SyntaxChecker(self.code_editor, self.config.get("syntax_check_delay_ms", 300))
         
         code_layout.addWidget(self.code_editor)
 
@@ -332,71 +1672,78 @@ class SidePython(QMainWindow):
         button_layout.addStretch()  # 左侧弹性空间，让按钮居中
 
         self.run_button = QPushButton("▶ 执行")
-        self.run_button.setStyleSheet("""
-            QPushButton {
-                background-color: #28a745;
-                color: white;
-                border: 1px solid #28a745;
-                padding: 8px 16px;
-                font-size: 10pt;
-                font-weight: bold;
-                border-radius: 4px;
-                min-width: 45px;
-            }
-            QPushButton:hover {
-                background-color: #218838;
-                border-color: #1e7e34;
-            }
-            QPushButton:pressed {
-                background-color: #1e7e34;
-            }
-        """)
+        self.run_button.setProperty("role", "run")
         self.run_button.clicked.connect(self.execute_code)
         button_layout.addWidget(self.run_button)
 
+        # 其他执行方式（批量等）收在执行按钮旁的下拉菜单里
+        self.run_menu = QMenu(self)
+        sweep_action = self.run_menu.addAction("📊 批量执行 (F6)")
+        sweep_action.setToolTip("输入框可写作 0:10:0.5、1,2,3 或 @data.csv:列名，对所有组合执行")
+        sweep_action.triggered.connect(self.execute_sweep)
+        bench_action = self.run_menu.addAction("⏱ 基准测试 (F8)")
+        bench_action.setToolTip("像 timeit 一样自动确定循环次数并重复多轮；含 # %% 时最后一个单元格为被测代码，之前的为准备代码")
+        bench_action.triggered.connect(self.execute_benchmark)
+        line_profile_action = self.run_menu.addAction("🔥 逐行性能分析 (F9)")
+        line_profile_action.setToolTip("统计每行的执行次数和耗时，显示在代码左侧并列出最耗时的行")
+        line_profile_action.triggered.connect(self.execute_line_profile)
+        call_profile_action = self.run_menu.addAction("📞 函数调用分析 (Shift+F9)")
+        call_profile_action.setToolTip("用 cProfile 统计函数的调用次数和耗时，在侧栏以调用树和函数列表显示")
+        call_profile_action.triggered.connect(self.execute_call_profile)
+        self.run_menu.addSeparator()
+        self.session_action = self.run_menu.addAction("🔁 会话模式（保留变量）")
+        self.session_action.setCheckable(True)
+        self.session_action.setToolTip("各次执行共享同一个命名空间，导入和耗时的准备工作只需执行一次")
+        self.session_action.toggled.connect(self.set_session_mode)
+        self.cells_action = self.run_menu.addAction("▦ 单元格模式（# %% 增量执行）")
+        self.cells_action.setCheckable(True)
+        self.cells_action.setToolTip("用 # %% 把代码分成单元格，只重新执行改动过的单元格及依赖它们的后续单元格")
+        self.cells_action.toggled.connect(self.set_cells_mode)
+        reset_action = self.run_menu.addAction("♻ 重置会话")
+        reset_action.triggered.connect(self.reset_session)
+        variables_action = self.run_menu.addAction("🔍 查看会话变量")
+        variables_action.triggered.connect(self.show_variables)
+        self.auto_action = self.run_menu.addAction("⚡ 实时执行（编辑后自动运行）")
+        self.auto_action.setCheckable(True)
+        self.auto_action.setToolTip("修改代码或输入后稍作停顿即自动执行，新的修改会取消仍在运行的旧执行")
+        self.auto_action.toggled.connect(self.set_auto_run)
+        self.run_menu.addSeparator()
+        self.memo_action = self.run_menu.addAction("💾 结果缓存（相同代码和输入直接返回）")
+        self.memo_action.setCheckable(True)
+        self.memo_action.setChecked(self.memo_enabled)
+        self.memo_action.setToolTip("只适合纯计算的代码；缓存保存在磁盘上，重启后仍然有效")
+        self.memo_action.toggled.connect(self.set_memo_enabled)
+        refresh_action = self.run_menu.addAction("⟳ 忽略缓存重新执行 (Ctrl+F5)")
+        refresh_action.triggered.connect(self.execute_refresh)
+        clear_memo_action = self.run_menu.addAction("🗑 清空结果缓存")
+        clear_memo_action.triggered.connect(self.clear_memo)
+        self.run_menu.addSeparator()
+        history_action = self.run_menu.addAction("📈 执行历史")
+        history_action.triggered.connect(self.show_history)
+        import_action = self.run_menu.addAction("📦 模块导入耗时")
+        import_action.setToolTip("列出 preload_modules 中各模块（及其依赖）的导入耗时，用于决定哪些模块值得预导入")
+        import_action.triggered.connect(self.show_import_report)
+        self.run_menu.setToolTipsVisible(True)
+
+        self.mode_button = QPushButton()
+        self.mode_button.setMenu(self.run_menu)
+        self.mode_button.setToolTip("更多执行方式")
+        self.mode_button.setProperty("role", "mode")
+        button_layout.addWidget(self.mode_button)
+
+        self.stop_button = QPushButton("■ 停止")
+        self.stop_button.setProperty("role", "stop")
+        self.stop_button.clicked.connect(self.stop_execution)
+        self.stop_button.setVisible(False)  # 仅在执行中显示
+        button_layout.addWidget(self.stop_button)
+
         self.clear_button = QPushButton("🗑 清空")
-        self.clear_button.setStyleSheet("""
-            QPushButton {
-                background-color: #dc3545;
-                color: white;
-                border: 1px solid #dc3545;
-                padding: 8px 16px;
-                font-size: 10pt;
-                font-weight: bold;
-                border-radius: 4px;
-                min-width: 45px;
-            }
-            QPushButton:hover {
-                background-color: #c82333;
-                border-color: #bd2130;
-            }
-            QPushButton:pressed {
-                background-color: #bd2130;
-            }
-        """)
+        self.clear_button.setProperty("role", "clear")
         self.clear_button.clicked.connect(self.clear_output)
         button_layout.addWidget(self.clear_button)
 
         self.topmost_button = QPushButton("📌 置顶")
-        self.topmost_button.setStyleSheet("""
-            QPushButton {
-                background-color: #007bff;
-                color: white;
-                border: 1px solid #007bff;
-                padding: 8px 16px;
-                font-size: 10pt;
-                font-weight: bold;
-                border-radius: 4px;
-                min-width: 45px;
-            }
-            QPushButton:hover {
-                background-color: #0056b3;
-                border-color: #004085;
-            }
-            QPushButton:pressed {
-                background-color: #004085;
-            }
-        """)
+        self.topmost_button.setProperty("role", "topmost")
         self.topmost_button.clicked.connect(self.toggle_topmost)
         button_layout.addWidget(self.topmost_button)
 
@@ -413,29 +1760,21 @@ class SidePython(QMainWindow):
         output_layout.setSpacing(5)
 
         output_label = QLabel("📤 输出结果：")
-        output_label.setStyleSheet("""
-            font-weight: bold; 
-            font-size: 10pt; 
-            color: #569cd6;
-            margin-bottom: 5px;
-        """)
+        output_label.setProperty("role", "heading")
         output_layout.addWidget(output_label)
 
-        self.output_text = QTextEdit()
-        self.output_text.setReadOnly(True)
+        # 运行状态指示
+        self.status_label = QLabel("")
+        self.status_label.setObjectName("statusLabel")
+        self.status_label.setVisible(False)
+        output_layout.addWidget(self.status_label)
+
+        self.output_text = OutputView(
+            self.config["output_max_lines"],
+            self.config["output_max_chars"]
+        )
         self.output_text.setFont(QFont("Consolas", 10))
         self.output_text.setMinimumHeight(20)  # 设置最小高度
-        self.output_text.setStyleSheet("""
-            QTextEdit {
-                background-color: #1e1e1e;
-                color: #d4d4d4;
-                border: 1px solid #3c3c3c;
-                border-radius: 4px;
-                padding: 8px;
-                font-family: 'Consolas', 'Monaco', 'Courier New', monospace;
-                line-height: 1.4;
-            }
-        """)
         output_layout.addWidget(self.output_text)
         
         splitter.addWidget(output_container)
@@ -462,6 +1801,30 @@ class SidePython(QMainWindow):
         ctrl_enter_shortcut = QShortcut(QKeySequence("Ctrl+Return"), self)
         ctrl_enter_shortcut.activated.connect(self.execute_code)
         
+        # F6 批量执行
+        sweep_shortcut = QShortcut(QKeySequence("F6"), self)
+        sweep_shortcut.activated.connect(self.execute_sweep)
+        
+        # F8 基准测试
+        bench_shortcut = QShortcut(QKeySequence("F8"), self)
+        bench_shortcut.activated.connect(self.execute_benchmark)
+        
+        # F9 逐行性能分析
+        line_profile_shortcut = QShortcut(QKeySequence("F9"), self)
+        line_profile_shortcut.activated.connect(self.execute_line_profile)
+        
+        # Shift+F9 函数调用分析
+        call_profile_shortcut = QShortcut(QKeySequence("Shift+F9"), self)
+        call_profile_shortcut.activated.connect(self.execute_call_profile)
+        
+        # Ctrl+F5 忽略结果缓存重新执行
+        refresh_shortcut = QShortcut(QKeySequence("Ctrl+F5"), self)
+        refresh_shortcut.activated.connect(self.execute_refresh)
+        
+        # Shift+F5 停止执行
+        stop_shortcut = QShortcut(QKeySequence("Shift+F5"), self)
+        stop_shortcut.activated.connect(self.stop_execution)
+        
         # Ctrl+L 清空输出
         clear_shortcut = QShortcut(QKeySequence("Ctrl+L"), self)
         clear_shortcut.activated.connect(self.clear_output)
@@ -472,16 +1835,7 @@ class SidePython(QMainWindow):
 
     def get_next_var_name(self):
         """获取下一个变量名"""
-        count = len(self.var_names)
-        if count == 0:
-            return 'x'
-        elif count == 1:
-            return 'y'
-        elif count == 2:
-            return 'z'
-        else:
-            # 之后使用 a, b, c...
-            return chr(ord('a') + count - 3)
+        return var_name(len(self.var_names))
 
     def add_input_field(self):
         """添加一个输入框"""
@@ -491,31 +1845,18 @@ class SidePython(QMainWindow):
         # 变量名标签
         label = QLabel(f"{var_name}=")
         label.setFont(QFont("Consolas", 10))
-        label.setStyleSheet("color: #d4d4d4; font-weight: bold;")
+        label.setProperty("role", "var")
 
         # 输入框
         input_field = QLineEdit()
         input_field.setPlaceholderText("数字...")
+        input_field.setToolTip("数字、Python 字面量（如 [1, 2]、'abc'），或 @data.npy / @data.bin:float32[:1000x3] 以内存映射加载数组")
         input_field.setFont(QFont("Consolas", 10))
         input_field.setFixedHeight(32)
         input_field.setFixedWidth(70)
-        input_field.setStyleSheet("""
-            QLineEdit {
-                background-color: #2d2d30;
-                color: #d4d4d4;
-                border: 1px solid #3c3c3c;
-                border-radius: 4px;
-                padding: 4px 8px;
-                font-family: 'Consolas', 'Monaco', 'Courier New', monospace;
-            }
-            QLineEdit:focus {
-                border-color: #007acc;
-                background-color: #1e1e1e;
-            }
-            QLineEdit:hover {
-                border-color: #5a5a5a;
-            }
-        """)
+        input_field.setProperty("role", "input")
+
+        input_field.textChanged.connect(self.schedule_auto_run)
 
         # 存储输入框和标签
         self.input_widgets.append({
@@ -565,59 +1906,338 @@ for i in range(3):
         self.code_editor.setPlainText(example_code)
         self.input_widgets[0]['input'].setText("5")
 
-    def execute_code(self):
-        """执行用户代码"""
+    def load_file(self, path):
+        """把代码文件的内容载入编辑器"""
+        try:
+            with open(path, encoding='utf-8') as f:
+                code = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            self.output_text.append_message(f"❌ 错误：无法打开文件 {path}：{e}")
+            return
+        self.code_editor.setPlainText(code)
+        self.setWindowTitle(f"SidePython - {os.path.basename(path)}")
+
+    def execute_code(self, benchmark=False, profile=None, refresh=False):
+        """执行用户代码（在后台进程中运行，不阻塞界面）
+
+        benchmark 为 True 时进行基准测试；profile 为 'lines' 时逐行性能分析，为 'calls' 时用 cProfile 分析函数调用；
+        refresh 为 True 时忽略结果缓存重新执行。
+        """
+        if self.runner.is_running():
+            return
+
         code = self.code_editor.toPlainText()
 
         if not code.strip():
-            self.output_text.append("❌ 错误：代码为空！\n")
+            self.output_text.append_message("❌ 错误：代码为空！\n")
             return
 
         # 清空之前的输出
         self.output_text.clear()
+        self.run_label = next(line.strip() for line in code.splitlines() if line.strip())[:60]
 
-        # 重定向标准输出
-        old_stdout = sys.stdout
-        sys.stdout = StringIO()
+        # 解析每个输入框的值（数字、字面量或数组文件）
+        try:
+            variables = parse_inputs(
+                (self.var_names[i], widget_dict['input'].text())
+                for i, widget_dict in enumerate(self.input_widgets)
+            )
+        except InputError as e:
+            self.output_text.append_message(f"❌ 错误：{e}")
+            return
 
+        if benchmark:
+            self.output_text.append_message("⏱ 基准测试中，代码的输出将被忽略…")
+            self.runner.run_benchmark(code, variables, self.config.get("timeout", 0))
+            return
+        if profile:
+            self.profile_code = code
+            self.runner.run_profile(code, variables, self.config.get("timeout", 0), profile)
+            return
+        self.runner.run(
+            code, variables, self.config.get("timeout", 0), self.session_mode, self.cells_mode,
+            memo=self.memo_enabled, refresh=refresh
+        )
+
+    def execute_line_profile(self):
+        """逐行性能分析：完整执行一次（不使用会话），统计每行的次数和耗时"""
+        self.execute_code(profile='lines')
+
+    def set_auto_run(self, enabled):
+        """开启或关闭实时执行"""
+        self.auto_run = enabled
+        if enabled:
+            self.schedule_auto_run()
+        else:
+            self.auto_timer.stop()
+            self.auto_pending = self.auto_skipped = False
+
+    def on_code_changed(self):
+        """代码被编辑时触发实时执行（语法高亮重新着色也会发出 textChanged，文本不变时忽略）"""
+        code = self.code_editor.toPlainText()
+        if code != self.auto_code:
+            self.auto_code = code
+            self.schedule_auto_run()
+
+    def schedule_auto_run(self):
+        """重新开始防抖计时"""
+        if self.auto_run:
+            self.auto_timer.start()
+
+    def run_auto(self):
+        """防抖结束后执行最新的代码，仍在运行的旧执行结果已过时"""
+        if self.runner.is_running():
+            if self.runner.current.kind != 'run':
+                # 不打断手动启动的批量执行、基准测试和性能分析，结束时在输出面板说明
+                self.auto_skipped = True
+                return
+            if self.session_mode or self.cells_mode:
+                # 中断会话进程会丢失会话变量，等当前执行结束后再运行最新代码
+                self.auto_pending = True
+                return
+            self.runner.cancel()
+        if self.code_editor.toPlainText().strip():
+            self.execute_code()
+        if not self.runner.is_running():
+            # 旧执行可能已取消而新执行没有启动（代码已清空或输入有误），恢复按钮和状态
+            self.run_button.setEnabled(True)
+            self.mode_button.setEnabled(True)
+            self.stop_button.setVisible(False)
+            if self.status_label.text().startswith("⏳"):
+                self.status_label.setVisible(False)
+
+    def execute_refresh(self):
+        """忽略结果缓存重新执行，并用新结果更新缓存"""
+        self.execute_code(refresh=True)
+
+    def set_memo_enabled(self, enabled):
+        """开启或关闭结果缓存"""
+        self.memo_enabled = enabled
+
+    def clear_memo(self):
+        """清空磁盘上的结果缓存"""
+        count = self.runner.memo.clear()
+        self.output_text.append_message(f"🗑 已清空结果缓存（{count} 条）")
+
+    def execute_call_profile(self):
+        """函数调用分析：在 cProfile 下完整执行一次（不使用会话）"""
+        self.execute_code(profile='calls')
+
+    def jump_to_line(self, line):
+        """把光标移到代码的第 line 行"""
+        block = self.code_editor.document().findBlockByNumber(line - 1)
+        if block.isValid():
+            self.code_editor.setTextCursor(QTextCursor(block))
+            self.code_editor.centerCursor()
+            self.code_editor.setFocus()
+
+    def execute_benchmark(self):
+        """基准测试：输入参数的解析与普通执行相同"""
+        self.execute_code(benchmark=True)
+
+    def execute_sweep(self):
+        """批量执行：把每个输入框解析为一组取值，对所有组合各执行一次"""
+        if self.runner.is_running():
+            return
+
+        code = self.code_editor.toPlainText()
+        if not code.strip():
+            self.output_text.append_message("❌ 错误：代码为空！\n")
+            return
+
+        self.output_text.clear()
         try:
-            # 创建执行环境，提供所有变量
-            exec_globals = {}
-
-            # 将每个输入框的值转换为 float 并添加到执行环境
-            for i, widget_dict in enumerate(self.input_widgets):
-                var_name = self.var_names[i]
-                input_text = widget_dict['input'].text().strip()
-
-                if input_text:
-                    try:
-                        exec_globals[var_name] = float(input_text)
-                    except ValueError:
-                        self.output_text.append(f"❌ 错误：变量 {var_name} 的值 '{input_text}' 不是有效的数字")
-                        return
-                else:
-                    exec_globals[var_name] = 0.0
+            names, points = expand_grid(
+                [(self.var_names[i], widget_dict['input'].text())
+                 for i, widget_dict in enumerate(self.input_widgets)],
+                self.config.get("sweep_max_points", 0)
+            )
+        except InputError as e:
+            self.output_text.append_message(f"❌ 错误：{e}")
+            return
 
-            exec_locals = {}
+        self.output_text.append_message(f"📊 批量执行 {len(points)} 组参数…")
+        self.runner.run_sweep(code, names, points, self.config.get("timeout", 0))
 
-            # 执行代码
-            exec(code, exec_globals, exec_locals)
+    def set_session_mode(self, enabled):
+        """切换会话模式"""
+        self.session_mode = enabled
+        if enabled:
+            self.output_text.append_message("🔁 已开启会话模式：变量在各次执行之间保留")
+        else:
+            self.output_text.append_message("已关闭会话模式，会话变量仍保留，重新开启后可继续使用")
+
+    def set_cells_mode(self, enabled):
+        """切换单元格模式（单元格之间通过会话命名空间共享结果）"""
+        self.cells_mode = enabled
+        if enabled:
+            self.output_text.append_message("▦ 已开启单元格模式：用 # %% 分隔单元格，只重新执行有变化的部分")
+
+    def reset_session(self):
+        """清空会话命名空间（正在执行时先停止）"""
+        self.runner.stop()
+        self.runner.pool.reset_session()
+        self.update_session_vars([])
+        self.output_text.append_message("♻ 会话已重置")
+
+    def show_variables(self):
+        """显示会话变量窗口"""
+        if self.variables_dialog is None:
+            self.variables_dialog = VariablesDialog(self)
+            self.variables_dialog.set_variables(self.session_vars)
+        self.variables_dialog.show()
+        self.variables_dialog.raise_()
+
+    def update_session_vars(self, variables):
+        """记录会话变量并刷新已打开的变量窗口"""
+        self.session_vars = variables
+        if self.variables_dialog is not None:
+            self.variables_dialog.set_variables(variables)
+
+    def stop_execution(self):
+        """停止正在执行的代码"""
+        self.runner.stop()
+
+    def on_run_started(self):
+        """执行开始：切换按钮并显示运行指示"""
+        self.run_button.setEnabled(False)
+        self.mode_button.setEnabled(False)
+        self.stop_button.setVisible(True)
+        self.status_label.setText("⏳ 运行中…")
+        self.status_label.setVisible(True)
+        self.run_has_output = False
+
+    def on_run_progress(self, text):
+        """刷新运行进度"""
+        self.status_label.setText(f"⏳ {text}")
+
+    def on_run_output(self, chunks):
+        """追加一批流式输出"""
+        self.output_text.append_chunks(chunks)
+        self.run_has_output = True
+
+    def on_run_finished(self, result):
+        """执行结束：显示输出或错误"""
+        self.run_button.setEnabled(True)
+        self.mode_button.setEnabled(True)
+        self.stop_button.setVisible(False)
+        self.update_status(result)
+        self.show_result(result)
+        if self.auto_skipped:
+            self.auto_skipped = False
+            if self.auto_run:
+                self.output_text.append_message("⏸ 执行期间代码有修改，实时执行没有打断这次手动启动的运行；再次编辑或按 F5 运行最新代码")
+
+    def show_result(self, result):
+        """在输出面板或结果窗口中显示执行结果"""
+        if result.get('benchmark') and result.get('ok'):
+            self.output_text.append_message(f"✓ 基准测试：{format_benchmark(result)}")
+            self.status_label.setText(
+                f"⏱ 每次最快 {format_duration(result['best'])} · 中位数 {format_duration(result['median'])}"
+                f" · 标准差 {format_duration(result['stdev'])}"
+            )
+            self.status_label.setVisible(True)
+            return
 
-            # 获取输出
-            output = sys.stdout.getvalue()
+        if result.get('profile') == 'lines' and result.get('line_profile'):
+            self.profile_gutter.set_stats(result['line_profile'])
+            self.profile_dialog = LineProfileDialog(
+                result['line_profile'], self.profile_code, self.config.get("profile_top_n", 20),
+                result['profile_backend'], self.jump_to_line, self
+            )
+            self.profile_dialog.show()
+
+        if result.get('profile') == 'calls' and result.get('call_stats'):
+            if self.call_profile_panel is None:
+                self.call_profile_panel = CallProfilePanel(self)
+                self.addDockWidget(Qt.RightDockWidgetArea, self.call_profile_panel)
+            self.call_profile_panel.set_stats(result['call_stats'])
+            self.call_profile_panel.show()
+
+        if result.get('sweep'):
+            self.output_text.append_message(f"✓ 批量执行完成：{format_sweep_stats(result['stats'])}")
+            self.sweep_dialog = SweepDialog(result, self)
+            self.sweep_dialog.show()
+            return
 
-            if output:
-                self.output_text.append(output)
-            else:
-                self.output_text.append("✓ 执行成功（无输出）")
+        if 'variables' in result:
+            self.update_session_vars(result['variables'])
+        elif (self.session_mode or self.cells_mode) and not result.get('ok'):
+            # 会话进程被终止，其中的变量随之丢失
+            self.update_session_vars([])
+
+        if self.auto_pending:
+            # 执行期间代码又被修改过，丢弃这次已过时的结果，直接运行最新代码
+            self.auto_pending = False
+            if self.auto_run and not result.get('stopped'):
+                self.execute_code()
+                return
+
+        output = result.get('output', '')
+        if output:
+            self.on_run_output([('stdout', output)])
+
+        if result.get('ok'):
+            if not self.run_has_output:
+                self.output_text.append_message("✓ 执行成功（无输出）")
+        else:
+            self.output_text.append_message(f"❌ 错误：{result.get('error', '')}")
 
-        except Exception as e:
-            # 显示错误信息
-            self.output_text.append(f"❌ 错误：{type(e).__name__}: {str(e)}")
+        if 'cells' in result:
+            self.output_text.append_message(f"▦ {format_cells_summary(result['cells'])}")
 
-        finally:
-            # 恢复标准输出
-            sys.stdout = old_stdout
+    def update_status(self, result):
+        """在输出下方显示本次执行的统计信息，并记入执行历史"""
+        if 'compile_cached' not in result:
+            self.status_label.setVisible(False)
+            return
+        if result.get('memo_hit'):
+            self.status_label.setText(f"💾 来自结果缓存 · 原执行 {format_run_stats(result)}")
+            self.status_label.setVisible(True)
+            return
+        if result['compile_cached']:
+            self.compile_hits += 1
+        else:
+            self.compile_misses += 1
+
+        text = format_run_stats(result)
+        previous = self.run_history[-1] if self.run_history else None
+        if previous and previous['ok'] and result['ok'] and previous['elapsed'] > 0:
+            change = result['elapsed'] / previous['elapsed'] - 1
+            text += f"（较上次 {change:+.0%}）"
+        text += f" · 编译缓存：命中 {self.compile_hits} / 未命中 {self.compile_misses}"
+        if 'variables' in result:
+            text += f" · 会话变量 {len(result['variables'])} 个"
+        self.status_label.setText(text)
+        self.status_label.setVisible(True)
+
+        if 'cpu' in result:
+            self.run_history.append({
+                'time': time.strftime("%H:%M:%S"),
+                'elapsed': result['elapsed'],
+                'cpu': result['cpu'],
+                'peak_memory': result['peak_memory'],
+                'ok': result['ok'],
+                'label': self.run_label,
+            })
+            if self.history_dialog is not None:
+                self.history_dialog.set_history(self.run_history)
+
+    def show_history(self):
+        """显示执行历史窗口"""
+        if self.history_dialog is None:
+            self.history_dialog = HistoryDialog(self)
+            self.history_dialog.set_history(self.run_history)
+        self.history_dialog.show()
+        self.history_dialog.raise_()
+
+    def show_import_report(self):
+        """显示预导入模块的导入耗时"""
+        if self.import_dialog is None:
+            self.import_dialog = ImportReportDialog(self)
+        self.import_dialog.set_report(self.runner.pool.import_report(), self.config.get("preload_modules", []))
+        self.import_dialog.show()
+        self.import_dialog.raise_()
 
     def clear_output(self):
         """清空输出框"""
@@ -634,47 +2254,13 @@ for i in range(3):
         if self.is_topmost:
             self.setWindowFlag(Qt.WindowStaysOnTopHint, True)
             self.topmost_button.setText("取消置顶")
-            self.topmost_button.setStyleSheet("""
-                QPushButton {
-                    background-color: #ff6b35;
-                    color: white;
-                    border: 1px solid #ff6b35;
-                    padding: 8px 16px;
-                    font-size: 10pt;
-                    font-weight: bold;
-                    border-radius: 4px;
-                    min-width: 45px;
-                }
-                QPushButton:hover {
-                    background-color: #ff5722;
-                    border-color: #ff5722;
-                }
-                QPushButton:pressed {
-                    background-color: #e64a19;
-                }
-            """)
         else:
             self.setWindowFlag(Qt.WindowStaysOnTopHint, False)
             self.topmost_button.setText("📌 置顶")
-            self.topmost_button.setStyleSheet("""
-                QPushButton {
-                    background-color: #007bff;
-                    color: white;
-                    border: 1px solid #007bff;
-                    padding: 8px 16px;
-                    font-size: 10pt;
-                    font-weight: bold;
-                    border-radius: 4px;
-                    min-width: 45px;
-                }
-                QPushButton:hover {
-                    background-color: #0056b3;
-                    border-color: #004085;
-                }
-                QPushButton:pressed {
-                    background-color: #004085;
-                }
-            """)
+        # 样式由全局样式表按 active 属性选择，只需重新 polish 这一个按钮
+        self.topmost_button.setProperty("active", self.is_topmost)
+        self.topmost_button.style().unpolish(self.topmost_button)
+        self.topmost_button.style().polish(self.topmost_button)
 
         # 恢复窗口位置和状态
         self.setGeometry(geometry)
@@ -682,7 +2268,9 @@ for i in range(3):
             self.show()
 
     def create_icon(self):
-        """创建应用图标"""
+        """创建应用图标（窗口和托盘共用，只绘制一次）"""
+        if self.icon is not None:
+            return self.icon
         pixmap = QPixmap(64, 64)
         pixmap.fill(Qt.transparent)
         
@@ -700,7 +2288,8 @@ for i in range(3):
         painter.drawText(pixmap.rect(), Qt.AlignCenter, "Py")
         
         painter.end()
-        return QIcon(pixmap)
+        self.icon = QIcon(pixmap)
+        return self.icon
 
     def is_autostart_enabled(self):
         """检查是否已启用开机启动"""
@@ -799,6 +2388,8 @@ for i in range(3):
 
     def create_tray_icon(self):
         """创建系统托盘图标"""
+        if self.tray_icon is not None:
+            return
         self.tray_icon = QSystemTrayIcon(self)
         self.tray_icon.setIcon(self.create_icon())
         self.tray_icon.setToolTip("SidePython - Python 快速执行器\n快捷键: Alt+P 显示/隐藏")
@@ -817,6 +2408,12 @@ for i in range(3):
         execute_action = tray_menu.addAction("▶ 执行代码")
         execute_action.triggered.connect(self.execute_code)
         
+        sweep_action = tray_menu.addAction("📊 批量执行")
+        sweep_action.triggered.connect(self.execute_sweep)
+        
+        stop_action = tray_menu.addAction("■ 停止执行")
+        stop_action.triggered.connect(self.stop_execution)
+        
         clear_action = tray_menu.addAction("🗑 清空输出")
         clear_action.triggered.connect(self.clear_output)
         
@@ -854,8 +2451,16 @@ for i in range(3):
         self.activateWindow()
         self.raise_()
     
+    def on_show_requested(self, path):
+        """再次启动程序时由新进程转发：显示窗口，并打开给定的文件"""
+        self.show_window()
+        if path:
+            self.load_file(path)
+
     def quit_application(self):
         """退出应用程序"""
+        self.server.stop()
+        self.runner.shutdown()
         self.unregister_global_hotkey()
         QApplication.instance().quit()
 
@@ -865,6 +2470,29 @@ for i in range(3):
         # 在窗口第一次显示时注册热键
         if not self.hotkey_registered and HOTKEY_AVAILABLE:
             QTimer.singleShot(500, self.register_global_hotkey)
+        # 窗口显示后在后台启动执行进程池（首次显示时等第一帧画完再启动）
+        if self.tray_icon is not None:
+            QTimer.singleShot(0, self.runner.pool.start)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.tray_icon is None and not self.startup_scheduled:
+            # 第一帧画完后再做不影响首帧的准备工作
+            self.startup_scheduled = True
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        """首帧之后的启动工作：托盘（含开机启动的注册表查询）和执行进程池"""
+        self.create_tray_icon()
+        self.runner.pool.start()
+        self.prewarm_timer.start()
+
+    def prewarm(self):
+        """界面空闲时让执行进程在后台导入 preload_modules；正在执行代码时稍后再试"""
+        if self.runner.is_running():
+            self.prewarm_timer.start()
+            return
+        self.runner.pool.prewarm()
     
     def nativeEvent(self, eventType, message):
         """处理Windows原生事件"""
@@ -916,6 +2544,8 @@ for i in range(3):
         """窗口关闭事件 - 最小化到托盘而不是退出"""
         event.ignore()
         self.hide()
+        if self.tray_icon is None:
+            self.create_tray_icon()
         self.tray_icon.showMessage(
             "SidePython",
             "程序已最小化到系统托盘",
@@ -927,13 +2557,20 @@ for i in range(3):
 
 
 def main():
+    # 打包为 exe 后子进程需要
+    multiprocessing.freeze_support()
+
     app = QApplication(sys.argv)
 
     # 设置应用样式
     app.setStyle('Fusion')
+    app.setStyleSheet(APP_STYLE)
 
     window = SidePython()
     window.show()
+    files = [arg for arg in sys.argv[1:] if not arg.startswith('-')]
+    if files:
+        window.load_file(files[0])
 
     sys.exit(app.exec())
 
@@ -0,0 +1,2429 @@
+"""SidePython 执行引擎（不依赖 Qt，可在子进程中运行）
+
+也可以无界面使用：python sidepython.py --run file.py --x 5 --y 2
+"""
+import sys
+import os
+import re
+import csv
+import ast
+import math
+import errno
+import json
+import argparse
+import itertools
+import time
+import statistics
+import types
+import hashlib
+import gc
+import cProfile
+import marshal
+import reprlib
+import sqlite3
+import importlib
+import threading
+import _thread
+import signal
+import warnings
+import socket
+import multiprocessing
+from io import StringIO, TextIOBase
+from collections import OrderedDict, deque
+
+# 用户配置文件
+CONFIG_PATH = os.path.join(os.path.expanduser("~"), ".sidepython", "config.json")
+# 结果缓存数据库
+MEMO_PATH = os.path.join(os.path.expanduser("~"), ".sidepython", "memo.sqlite3")
+
+DEFAULT_CONFIG = {
+    "timeout": 30,  # 单次执行的墙钟超时（秒），0 表示不限制
+    "workers": 2,  # 常驻执行进程数量
+    "preload_modules": [],  # 执行进程预先导入的模块，如 ["numpy", "pandas"]（界面启动后空闲片刻再导入）
+    "output_max_lines": 10000,  # 输出面板保留的最大行数
+    "output_max_chars": 2000000,  # 输出面板保留的最大字符数
+    "code_cache_size": 64,  # 每个执行进程缓存的编译结果数量
+    "sweep_max_points": 1000000,  # 批量模式参数网格的最大组合数
+    "sweep_workers": 0,  # 批量模式并行的执行进程数，0 表示 CPU 核数
+    "history_size": 20,  # 保留最近多少次执行的耗时、CPU 时间和峰值内存
+    "benchmark_repeat": 7,  # 基准测试的轮数
+    "profile_top_n": 20,  # 逐行性能分析排行显示的行数
+    "memo_enabled": False,  # 是否默认开启结果缓存（相同代码和输入直接返回上次的输出）
+    "memo_max_mb": 64,  # 结果缓存的磁盘占用上限（MB）
+    "auto_run_delay_ms": 400,  # 实时执行的防抖延迟（毫秒）
+    "syntax_check_delay_ms": 300,  # 后台语法检查的防抖延迟（毫秒）
+    "server_enabled": False,  # 是否开启本地执行服务（其他程序可通过本地套接字提交代码）
+    "prewarm_delay_ms": 2000,  # 界面启动后空闲多久开始预导入 preload_modules（毫秒）
+    "server_name": "sidepython",  # 本地执行服务的名称（Windows 上为命名管道名，其他平台为套接字文件名）
+    "memory_limit_mb": None,  # 执行进程的内存上限（MB），null 表示物理内存的 75%，0 表示不限制
+    "cpu_limit_s": 0,  # 单次执行的 CPU 时间上限（秒），0 表示不限制
+    "output_limit_mb": 64,  # 单次执行的输出大小上限（MB），0 表示不限制
+}
+
+# 统一使用 spawn，避免在已加载 Qt 的进程上 fork
+_mp = multiprocessing.get_context("spawn")
+
+
+def load_config(path=CONFIG_PATH):
+    """读取用户配置，文件缺失或损坏时使用默认值"""
+    config = dict(DEFAULT_CONFIG)
+    try:
+        with open(path, encoding="utf-8") as f:
+            user_config = json.load(f)
+        if isinstance(user_config, dict):
+            config.update(user_config)
+    except (OSError, ValueError):
+        pass
+    return config
+
+
+class InputError(ValueError):
+    """输入值无法解析"""
+
+
+class ResourceLimitError(BaseException):
+    """执行超出了资源限制（CPU 时间或输出大小）
+
+    与 KeyboardInterrupt 一样派生自 BaseException，用户代码中的 except Exception 不会把它吞掉。
+    """
+
+
+def var_name(index):
+    """第 index 个输入框对应的变量名：x, y, z, 之后为 a, b, c..."""
+    if index < 3:
+        return 'xyz'[index]
+    return chr(ord('a') + index - 3)
+
+
+def parse_inputs(values):
+    """把 [(变量名, 文本), ...] 解析为执行环境中的变量
+
+    数字解析为 float，空值视为 0.0；其他文本按 Python 字面量解析（列表、字符串、元组等）；
+    @路径 表示数组文件，见 parse_array_spec。
+    """
+    variables = {}
+    for name, text in values:
+        text = text.strip()
+        if not text:
+            variables[name] = 0.0
+            continue
+        if text.startswith('@'):
+            variables[name] = parse_array_spec(text[1:])
+            continue
+        try:
+            variables[name] = float(text)
+            continue
+        except ValueError:
+            pass
+        try:
+            variables[name] = ast.literal_eval(text)
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            raise InputError(f"变量 {name} 的值 '{text}' 不是有效的数字或 Python 字面量") from None
+    return variables
+
+
+class ArrayInput:
+    """指向磁盘上数组文件的输入，在执行进程中以内存映射方式加载"""
+    def __init__(self, path, dtype=None, shape=None):
+        self.path = path
+        self.dtype = dtype  # None 表示 .npy 文件，类型和形状取自文件头
+        self.shape = shape
+
+    def __repr__(self):
+        return f"ArrayInput({self.path!r}, dtype={self.dtype!r}, shape={self.shape!r})"
+
+    def spec(self):
+        """还原为输入框中的写法（绝对路径），可再次交给 parse_inputs 解析"""
+        text = f"@{self.path}"
+        if self.dtype:
+            text += f":{self.dtype}"
+        if self.shape:
+            text += ":" + "x".join(str(n) for n in self.shape)
+        return text
+
+
+def parse_array_spec(spec):
+    """解析数组文件输入：data.npy，或原始二进制文件 data.bin:float32[:1000x3]"""
+    path, extra = spec.strip(), []
+    # 路径本身可能含冒号（如 C:\data.npy），从右侧逐段剥离类型和形状
+    while not os.path.isfile(path) and ':' in path and len(extra) < 2:
+        path, _, part = path.rpartition(':')
+        extra.insert(0, part.strip())
+    if not os.path.isfile(path):
+        raise InputError(f"找不到数组文件 '{spec.strip()}'")
+
+    dtype = extra[0] if extra else None
+    shape = None
+    if len(extra) == 2:
+        try:
+            shape = tuple(int(n) for n in extra[1].lower().split('x'))
+        except ValueError:
+            raise InputError(f"无法解析数组形状 '{extra[1]}'，应写作 1000x3") from None
+    if dtype is None and not path.lower().endswith('.npy'):
+        raise InputError(f"原始二进制文件 '{path}' 需要指定元素类型，如 @{path}:float32")
+    return ArrayInput(os.path.abspath(path), dtype, shape)
+
+
+def parse_sweep_value(text, max_points=None):
+    """解析批量模式下一个输入框的取值，返回 float 列表
+
+    支持：5（单个值）、1,2,5 或 [1, 2, 5]（列表）、0:10 或 0:1:0.1（区间，不含终点，默认步长 1）、
+    @data.csv:列名（CSV 文件中的一列，列名或从 0 开始的序号，省略时取第一列）。
+    """
+    text = text.strip()
+    if not text:
+        return [0.0]
+    if text.startswith('@'):
+        return _read_csv_column(text[1:])
+
+    try:
+        if text.startswith('['):
+            return [float(v) for v in ast.literal_eval(text)]
+        if ',' in text:
+            return [float(v) for v in text.split(',') if v.strip()]
+        if ':' in text:
+            parts = [float(v) for v in text.split(':')]
+            if len(parts) not in (2, 3):
+                raise ValueError
+            start, stop = parts[0], parts[1]
+            step = parts[2] if len(parts) == 3 else 1.0
+            if step <= 0:
+                raise InputError(f"区间 '{text}' 的步长必须为正数")
+            # 用乘法而不是累加生成，避免浮点误差累积
+            count = max(0, math.ceil((stop - start) / step - 1e-9))
+            if max_points and count > max_points:
+                raise InputError(f"区间 '{text}' 共 {count} 个取值，超过上限 {max_points}")
+            return [start + i * step for i in range(count)]
+        return [float(text)]
+    except InputError:
+        raise
+    except (ValueError, TypeError, SyntaxError):
+        raise InputError(f"无法解析批量输入 '{text}'") from None
+
+
+def _read_csv_column(spec):
+    """读取 CSV 文件中的一列数值（spec 为 路径[:列]）"""
+    path, column = spec, None
+    if not os.path.exists(spec):
+        # 整个 spec 不是文件时才把最后一个冒号之后当作列名（路径本身可能含冒号）
+        head, _, tail = spec.rpartition(':')
+        if head and tail:
+            path, column = head, tail
+    try:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            rows = [row for row in csv.reader(f) if row]
+    except OSError as e:
+        raise InputError(f"无法读取 CSV 文件 '{spec}'：{e.strerror}") from None
+    if not rows:
+        raise InputError(f"CSV 文件 '{path}' 为空")
+
+    header = rows[0]
+    if column is None:
+        index = 0
+    elif column in header:
+        index = header.index(column)
+    elif column.isdigit():
+        index = int(column)
+    else:
+        raise InputError(f"CSV 文件 '{path}' 中没有列 '{column}'")
+
+    # 首行无法解析为数字时视为表头
+    try:
+        float(header[index])
+    except (ValueError, IndexError):
+        rows = rows[1:]
+
+    values = []
+    for line, row in enumerate(rows, 1):
+        if index >= len(row) or not row[index].strip():
+            continue
+        try:
+            values.append(float(row[index]))
+        except ValueError:
+            raise InputError(f"CSV 文件 '{path}' 第 {line} 行的值 '{row[index]}' 不是有效的数字") from None
+    return values
+
+
+def expand_grid(values, max_points=None):
+    """把 [(变量名, 批量输入文本), ...] 展开为参数网格，返回 (变量名列表, [变量字典, ...])"""
+    names = []
+    axes = []
+    total = 1
+    for name, text in values:
+        axis = parse_sweep_value(text, max_points)
+        if not axis:
+            raise InputError(f"变量 {name} 的批量输入 '{text.strip()}' 没有任何取值")
+        names.append(name)
+        axes.append(axis)
+        total *= len(axis)
+    if max_points and total > max_points:
+        raise InputError(f"参数组合共 {total} 个，超过上限 {max_points}")
+    points = [dict(zip(names, combo)) for combo in itertools.product(*axes)]
+    return names, points
+
+
+class CodeCache:
+    """编译结果的 LRU 缓存，以源码哈希为键；语法错误同样会被缓存"""
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()  # 源码哈希 -> code 对象或编译异常
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, source, filename="<snippet>"):
+        """返回 (code 对象或编译异常, 是否命中缓存)"""
+        key = hashlib.sha1(f"{filename}\0{source}".encode('utf-8', 'surrogatepass')).hexdigest()
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry, True
+
+        self.misses += 1
+        try:
+            entry = compile(source, filename, 'exec')
+        except (SyntaxError, ValueError) as e:
+            entry = e
+        self.entries[key] = entry
+        while len(self.entries) > max(1, self.maxsize):
+            self.entries.popitem(last=False)
+        return entry, False
+
+    def clear(self):
+        self.entries.clear()
+
+
+def check_syntax(source):
+    """完整编译一次源码（不执行），没有语法错误时返回 None，
+    否则返回 {'line', 'col', 'end_line', 'end_col', 'message'}（行列从 1 开始，结束位置可能为 None）
+    """
+    try:
+        with warnings.catch_warnings():
+            # 无效转义等 SyntaxWarning 只在真正执行时提示
+            warnings.simplefilter('ignore')
+            compile(source, "<snippet>", 'exec', dont_inherit=True)
+    except SyntaxError as e:
+        return {
+            'line': e.lineno or 1,
+            'col': e.offset or 1,
+            'end_line': getattr(e, 'end_lineno', None),
+            'end_col': getattr(e, 'end_offset', None),
+            'message': f"{type(e).__name__}: {e.msg}",
+        }
+    except ValueError as e:
+        # 源码中含有空字符等
+        return {'line': 1, 'col': 1, 'end_line': None, 'end_col': None, 'message': f"ValueError: {e}"}
+    return None
+
+
+class MemoCache:
+    """执行结果的磁盘缓存（SQLite），以源码和输入值的哈希为键，按总大小做 LRU 淘汰
+
+    只适合纯计算的代码：相同的源码和输入直接返回上次的输出。数据库在首次使用时打开，
+    无法打开（如目录只读）时缓存自动失效，不影响正常执行。
+    """
+    def __init__(self, path=MEMO_PATH, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.db = None
+        self.failed = False
+
+    def _connect(self):
+        if self.db is None and not self.failed:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self.db = sqlite3.connect(self.path)
+                self.db.execute(
+                    "CREATE TABLE IF NOT EXISTS memo "
+                    "(key TEXT PRIMARY KEY, data TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+                )
+            except (OSError, sqlite3.Error):
+                self.failed = True
+                self.db = None
+        return self.db
+
+    @staticmethod
+    def key(code, variables):
+        """由源码和输入计算缓存键；数组文件输入按路径和文件修改时间、大小计入"""
+        parts = [code]
+        for name, value in sorted(variables.items()):
+            if isinstance(value, ArrayInput):
+                try:
+                    st = os.stat(value.path)
+                except OSError:
+                    return None
+                value = ('array', value.path, value.dtype, value.shape, st.st_mtime_ns, st.st_size)
+            parts.append(f"{name}={type(value).__name__}:{value!r}")
+        return hashlib.sha256('\0'.join(parts).encode('utf-8', 'surrogatepass')).hexdigest()
+
+    def get(self, key):
+        """返回缓存的数据，未命中时返回 None"""
+        db = self._connect()
+        if db is None or key is None:
+            return None
+        try:
+            row = db.execute("SELECT data FROM memo WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            with db:
+                db.execute("UPDATE memo SET last_used = ? WHERE key = ?", (time.time(), key))
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError):
+            return None
+
+    def put(self, key, data):
+        """保存数据，超出总大小时淘汰最久未使用的条目"""
+        db = self._connect()
+        if db is None or key is None:
+            return
+        text = json.dumps(data, ensure_ascii=False)
+        size = len(text.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        try:
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO memo (key, data, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, text, size, time.time())
+                )
+                total = db.execute("SELECT COALESCE(SUM(size), 0) FROM memo").fetchone()[0]
+                if total > self.max_bytes:
+                    for old_key, old_size in db.execute("SELECT key, size FROM memo ORDER BY last_used").fetchall():
+                        if total <= self.max_bytes:
+                            break
+                        db.execute("DELETE FROM memo WHERE key = ?", (old_key,))
+                        total -= old_size
+        except sqlite3.Error:
+            pass
+
+    def clear(self):
+        """清空缓存，返回删除的条目数"""
+        db = self._connect()
+        if db is None:
+            return 0
+        try:
+            with db:
+                count = db.execute("DELETE FROM memo").rowcount
+            db.execute("VACUUM")
+            return count
+        except sqlite3.Error:
+            return 0
+
+
+# 当前进程的编译缓存
+code_cache = CodeCache(DEFAULT_CONFIG["code_cache_size"])
+
+
+class ArrayCache:
+    """数组文件的内存映射缓存：文件未变化（修改时间和大小相同）时各次执行复用同一个映射"""
+    def __init__(self):
+        self.entries = {}  # (路径, 类型, 形状) -> (文件状态, 只读数组)
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, spec):
+        """返回 spec 对应的只读内存映射数组"""
+        try:
+            st = os.stat(spec.path)
+        except OSError as e:
+            raise InputError(f"无法读取数组文件 '{spec.path}'：{e.strerror}") from None
+        key = (spec.path, spec.dtype, spec.shape)
+        stamp = (st.st_mtime_ns, st.st_size)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        try:
+            import numpy as np
+        except ImportError:
+            raise InputError("加载数组文件需要安装 numpy") from None
+        try:
+            if spec.dtype is None:
+                array = np.load(spec.path, mmap_mode='r', allow_pickle=False)
+            else:
+                array = np.memmap(spec.path, dtype=np.dtype(spec.dtype), mode='r', shape=spec.shape)
+        except (OSError, ValueError, TypeError) as e:
+            if getattr(e, 'errno', None) == errno.ENOMEM:
+                # 与执行中的内存不足一样处理，由 RunLimits 换成说明内存上限的提示
+                raise MemoryError(f"无法加载数组文件 '{spec.path}'：{e.strerror}") from None
+            raise InputError(f"无法加载数组文件 '{spec.path}'：{e}") from None
+        self.entries[key] = (stamp, array)
+        return array
+
+    def resolve(self, variables):
+        """把变量中的 ArrayInput 替换为对应的数组，返回新的字典"""
+        return {
+            name: self.load(value) if isinstance(value, ArrayInput) else value
+            for name, value in variables.items()
+        }
+
+
+# 当前进程的数组映射缓存
+array_cache = ArrayCache()
+
+
+def iter_code_objects(code):
+    """code 及其中嵌套定义的所有函数、类、推导式的 code 对象"""
+    yield code
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            yield from iter_code_objects(const)
+
+
+class LineProfiler:
+    """逐行统计片段代码的执行次数和耗时
+
+    Python 3.12+ 使用 sys.monitoring，只在片段自身的 code 对象上开启 LINE 事件；
+    更早的版本使用 sys.settrace，只为片段的栈帧返回逐行跟踪函数。两种方式都不跟踪库代码，
+    调用库函数的耗时计入发起调用的那一行；调用片段内定义的函数时，耗时计入函数体中的各行。
+    """
+    def __init__(self, filename="<snippet>"):
+        self.filename = filename
+        self.stats = {}  # 行号 -> [次数, 耗时]
+        self.current = None  # 正在执行的行号
+        self.line_start = 0.0
+        self.backend = None
+
+    def _on_line(self, lineno):
+        now = time.perf_counter()
+        if self.current is not None:
+            self.stats[self.current][1] += now - self.line_start
+        entry = self.stats.get(lineno)
+        if entry is None:
+            entry = self.stats[lineno] = [0, 0.0]
+        entry[0] += 1
+        self.current = lineno
+        self.line_start = time.perf_counter()
+
+    def _finish_line(self):
+        if self.current is not None:
+            self.stats[self.current][1] += time.perf_counter() - self.line_start
+            self.current = None
+
+    def run(self, code, exec_globals, exec_locals):
+        """在逐行统计下执行 code"""
+        monitoring = getattr(sys, 'monitoring', None)
+        if monitoring is not None:
+            try:
+                monitoring.use_tool_id(monitoring.PROFILER_ID, "sidepython")
+            except ValueError:
+                monitoring = None  # 工具编号已被其他分析器占用
+        if monitoring is not None:
+            self._run_monitoring(monitoring, code, exec_globals, exec_locals)
+        else:
+            self._run_settrace(code, exec_globals, exec_locals)
+
+    def _run_monitoring(self, monitoring, code, exec_globals, exec_locals):
+        self.backend = "sys.monitoring"
+        tool = monitoring.PROFILER_ID
+        codes = list(iter_code_objects(code))
+        monitoring.register_callback(tool, monitoring.events.LINE, lambda code, lineno: self._on_line(lineno))
+        try:
+            for c in codes:
+                monitoring.set_local_events(tool, c, monitoring.events.LINE)
+            exec(code, exec_globals, exec_locals)
+        finally:
+            self._finish_line()
+            for c in codes:
+                monitoring.set_local_events(tool, c, 0)
+            monitoring.register_callback(tool, monitoring.events.LINE, None)
+            monitoring.free_tool_id(tool)
+
+    def _run_settrace(self, code, exec_globals, exec_locals):
+        self.backend = "sys.settrace"
+        filename = self.filename
+
+        def local_trace(frame, event, arg):
+            if event == 'line':
+                self._on_line(frame.f_lineno)
+            return local_trace
+
+        def global_trace(frame, event, arg):
+            # 只为片段自身的栈帧开启逐行跟踪
+            return local_trace if frame.f_code.co_filename == filename else None
+
+        old_trace = sys.gettrace()
+        sys.settrace(global_trace)
+        try:
+            exec(code, exec_globals, exec_locals)
+        finally:
+            sys.settrace(old_trace)
+            self._finish_line()
+
+    def results(self):
+        """[(行号, 次数, 耗时), ...]，按行号排序"""
+        return sorted((lineno, hits, spent) for lineno, (hits, spent) in self.stats.items())
+
+
+class ImportTimer:
+    """在 with 块内记录每个模块的导入耗时，口径与 python -X importtime 相同
+
+    records 按导入完成的顺序排列：(嵌套深度, 模块名, 自身耗时, 累计耗时)，
+    深度为 d 的记录是紧挨在它前面的深度 d+1 的记录的父模块。
+    """
+    def __init__(self):
+        self.records = []
+        self.stack = []  # 每层正在导入的模块中，已完成的子模块耗时之和
+        self.bootstrap = sys.modules.get('importlib._bootstrap')
+        self.original = None
+
+    def __enter__(self):
+        # 模块尚未导入时，import 语句和 importlib.import_module 都会经过 importlib._bootstrap._find_and_load；
+        # 不同解释器若没有这个函数，只记录总耗时
+        self.original = getattr(self.bootstrap, '_find_and_load', None)
+        if self.original is not None:
+            self.bootstrap._find_and_load = self._find_and_load
+        return self
+
+    def __exit__(self, *exc):
+        if self.original is not None:
+            self.bootstrap._find_and_load = self.original
+        return False
+
+    def _find_and_load(self, name, import_):
+        self.stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self.original(name, import_)
+        finally:
+            total = time.perf_counter() - start
+            nested = self.stack.pop()
+            if self.stack:
+                self.stack[-1] += total
+            self.records.append((len(self.stack), name, total - nested, total))
+
+
+def import_modules(names):
+    """依次导入模块并计时，返回 {'modules': [{'name', 'elapsed', 'error'}, ...], 'records', 'pid'}
+
+    records 为 ImportTimer 的逐模块记录；已经导入过的模块耗时接近 0。
+    """
+    modules = []
+    with ImportTimer() as timer:
+        for name in names:
+            start = time.perf_counter()
+            error = None
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            modules.append({'name': name, 'elapsed': time.perf_counter() - start, 'error': error})
+    return {'modules': modules, 'records': timer.records, 'pid': os.getpid()}
+
+
+def _record_error(result, e):
+    """把用户代码抛出的异常记入结果字典；内存不足时另记在 memory_error 中，由 RunLimits 换成说明上限的提示"""
+    error = f"{type(e).__name__}: {str(e)}"
+    result.update(ok=False, error=error)
+    if isinstance(e, MemoryError) or (isinstance(e, OSError) and e.errno == errno.ENOMEM):
+        # 代码中的 mmap 等系统调用超出上限时得到的是 ENOMEM
+        result['memory_error'] = error
+
+
+def run_code(code, variables, stdout=None, stderr=None, result_name=None, namespace=None, profiler=None):
+    """在当前进程中执行代码，返回结果字典
+
+    未指定 stdout/stderr 时输出收集到结果的 output 字段，否则直接写入给定的流。
+    指定 result_name 时，执行后该变量的 repr 放在结果的 value 字段。
+    指定 namespace 时在该字典中执行（会话模式），执行后定义的变量保留在其中。
+    指定 profiler 时通过 profiler.run(code, globals, locals) 执行，以便收集性能数据。
+    """
+    capture = StringIO()
+    old_stdout, old_stderr = sys.stdout, sys.stderr
+    sys.stdout = stdout if stdout is not None else capture
+    sys.stderr = stderr if stderr is not None else capture
+    result = {'ok': True, 'compile_cached': False, 'elapsed': 0.0}
+    start = time.perf_counter()
+
+    try:
+        compiled, result['compile_cached'] = code_cache.get(code)
+        if isinstance(compiled, Exception):
+            # 清掉上次抛出时留下的 traceback，避免重复抛出时不断累积
+            raise compiled.with_traceback(None)
+        if namespace is not None:
+            namespace.update(array_cache.resolve(variables))
+            exec_globals = exec_locals = namespace
+        else:
+            exec_globals = array_cache.resolve(variables)
+            exec_locals = {}
+        if profiler is not None:
+            profiler.run(compiled, exec_globals, exec_locals)
+        else:
+            exec(compiled, exec_globals, exec_locals)
+        if result_name is not None:
+            value = exec_locals.get(result_name, exec_globals.get(result_name))
+            result['value'] = None if value is None else repr(value)
+    except SystemExit as e:
+        # 用户代码调用 sys.exit() 不应结束宿主进程
+        result.update(ok=False, error=f"SystemExit: {e.code}")
+    except ResourceLimitError as e:
+        result.update(ok=False, error=str(e))
+    except Exception as e:
+        _record_error(result, e)
+    finally:
+        sys.stdout, sys.stderr = old_stdout, old_stderr
+
+    result['elapsed'] = time.perf_counter() - start
+    result['output'] = capture.getvalue()
+    return result
+
+
+class CallProfiler:
+    """用 cProfile 统计函数级的调用次数和耗时"""
+    def __init__(self):
+        self.stats = {}
+
+    def run(self, code, exec_globals, exec_locals):
+        """在 cProfile 下执行 code，结果为 pstats 格式的字典：
+        {(文件, 行号, 函数名): (原生调用次数, 调用次数, 自身耗时, 累计耗时, {调用方: (调用次数, 原生调用次数, 自身耗时, 累计耗时)})}
+        """
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            exec(code, exec_globals, exec_locals)
+        finally:
+            profile.disable()
+            profile.create_stats()
+            # 去掉 profile.disable 自身的记录
+            self.stats = {
+                func: entry for func, entry in profile.stats.items()
+                if not func[2].startswith("<method 'disable' of '_lsprof.Profiler'")
+            }
+
+
+SNIPPET_ROOT = ("<snippet>", 1, "<module>")  # 片段顶层代码在调用统计中的键
+
+
+def func_label(func):
+    """调用统计中函数键的可读名称"""
+    filename, lineno, name = func
+    if filename == '~':
+        return name  # 内置函数，如 <built-in method builtins.print>
+    if filename == '<snippet>':
+        return f"{name}（片段第 {lineno} 行）"
+    return f"{name}（{os.path.basename(filename)}:{lineno}）"
+
+
+def call_graph(stats):
+    """由调用统计得到 {调用方: [(被调用函数, (调用次数, 原生调用次数, 自身耗时, 累计耗时)), ...]}"""
+    children = {}
+    for func, (cc, nc, tt, ct, callers) in stats.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((func, edge))
+    return children
+
+
+def call_roots(stats):
+    """调用树的根：片段顶层代码；找不到时取没有调用方的函数"""
+    if SNIPPET_ROOT in stats:
+        return [SNIPPET_ROOT]
+    return [func for func, entry in stats.items() if not entry[4]]
+
+
+def collapsed_stacks(stats, max_depth=64):
+    """把调用统计转换为火焰图工具（flamegraph.pl、speedscope 等）使用的折叠栈文本
+
+    cProfile 只记录调用方与被调用方的关系而不记录完整调用栈，这里从根出发，
+    按各调用边的累计耗时比例向下分摊时间，权重单位为微秒。
+    """
+    children = call_graph(stats)
+    weights = {}
+
+    def walk(func, share, path):
+        cc, nc, tt, ct, callers = stats[func]
+        path = path + (func_label(func).replace(';', ':'),)
+        if ct <= 0:
+            return
+        self_time = share * tt / ct
+        if self_time > 0:
+            weights[path] = weights.get(path, 0.0) + self_time
+        if len(path) >= max_depth:
+            return
+        for child, edge in children.get(func, ()):
+            if child in path_funcs:
+                continue  # 递归调用，时间已计入上层
+            path_funcs.add(child)
+            walk(child, share * edge[3] / ct, path)
+            path_funcs.discard(child)
+
+    for root in call_roots(stats):
+        path_funcs = {root}
+        walk(root, stats[root][3], ())
+    return ''.join(
+        f"{';'.join(path)} {round(weight * 1e6)}\n"
+        for path, weight in weights.items() if round(weight * 1e6) > 0
+    )
+
+
+def write_pstats(path, stats):
+    """按 pstats 的文件格式（marshal）保存调用统计，可用 pstats.Stats、snakeviz 等打开"""
+    with open(path, 'wb') as f:
+        marshal.dump(stats, f)
+
+
+def run_profile(code, variables, mode, stdout=None, stderr=None):
+    """以性能分析方式执行代码
+
+    mode 为 lines 时结果的 line_profile 字段为 [(行号, 次数, 耗时), ...]；
+    为 calls 时 call_stats 字段为 cProfile 的调用统计（见 CallProfiler）。
+    """
+    if mode == 'calls':
+        profiler = CallProfiler()
+        result = run_code(code, variables, stdout, stderr, profiler=profiler)
+        result.update(profile=mode, call_stats=profiler.stats)
+    else:
+        profiler = LineProfiler()
+        result = run_code(code, variables, stdout, stderr, profiler=profiler)
+        result.update(profile=mode, line_profile=profiler.results(), profile_backend=profiler.backend)
+    return result
+
+
+def new_namespace():
+    """会话模式使用的空命名空间"""
+    return {'__name__': '__main__'}
+
+
+_short_repr = reprlib.Repr()
+_short_repr.maxstring = 60
+_short_repr.maxother = 60
+
+
+def value_size(value):
+    """估算变量占用的内存（字节）：数组取 nbytes，容器额外计入元素，元素过多时按前 1000 个抽样估算"""
+    nbytes = getattr(value, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple, set, frozenset, dict)) and value:
+        items = value.items() if isinstance(value, dict) else value
+        sample = list(itertools.islice(items, 1000))
+        if isinstance(value, dict):
+            sample_size = sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in sample)
+        else:
+            sample_size = sum(sys.getsizeof(v) for v in sample)
+        size += sample_size * len(value) // len(sample)
+    return size
+
+
+def describe_namespace(namespace, limit=500):
+    """列出会话中的用户变量：[{'name', 'type', 'size', 'value'}, ...]，按名称排序
+
+    跳过下划线开头的名称、模块以及 from ... import 引入的函数和类。
+    """
+    rows = []
+    for name in sorted(namespace):
+        value = namespace[name]
+        if name.startswith('_') or isinstance(value, types.ModuleType):
+            continue
+        if getattr(value, '__module__', '__main__') not in ('__main__', 'builtins') and \
+                isinstance(value, (type, types.FunctionType, types.BuiltinFunctionType)):
+            continue
+        try:
+            text = _short_repr.repr(value)
+        except Exception as e:
+            text = f"<repr 失败：{type(e).__name__}>"
+        try:
+            size = value_size(value)
+        except Exception:
+            size = 0
+        rows.append({'name': name, 'type': type(value).__name__, 'size': size, 'value': text})
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+def format_size(size):
+    """把字节数格式化为 B/KB/MB/GB"""
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+CELL_MARKER_RE = re.compile(r'^\s*#\s*%%')
+
+
+def split_cells(code):
+    """按 # %% 标记把代码切分为单元格，返回 [(起始行号（从 0 开始）, 源码), ...]
+
+    第一个标记之前的内容单独成为一个单元格（为空时忽略）。
+    """
+    cells = []
+    start, lines = 0, []
+    for number, line in enumerate(code.splitlines(keepends=True)):
+        if CELL_MARKER_RE.match(line):
+            if lines and (cells or ''.join(lines).strip()):
+                cells.append((start, ''.join(lines)))
+            start, lines = number, []
+        lines.append(line)
+    if lines and (cells or ''.join(lines).strip()):
+        cells.append((start, ''.join(lines)))
+    return cells
+
+
+def _base_name(node):
+    """data[0].attr 这类表达式最外层的变量名，不是变量时返回 None"""
+    while isinstance(node, (ast.Attribute, ast.Subscript)):
+        node = node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+
+class _CellNames(ast.NodeVisitor):
+    """收集一个单元格在模块层定义（或修改）的名称以及读取的名称"""
+    # 原地修改对象的常见方法（list / dict / set / deque / numpy 数组）
+    MUTATING_METHODS = frozenset({
+        'append', 'extend', 'insert', 'pop', 'remove', 'clear', 'update', 'sort', 'reverse',
+        'add', 'discard', 'setdefault', 'popitem', 'difference_update', 'intersection_update',
+        'symmetric_difference_update', 'appendleft', 'extendleft', 'popleft', 'rotate', 'fill', 'resize',
+    })
+
+    def __init__(self):
+        self.defines = set()
+        self.uses = set()
+        self.depth = 0  # 所在函数/类的嵌套层数，只有第 0 层的赋值会影响命名空间
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self.uses.add(node.id)
+        elif self.depth == 0:
+            self.defines.add(node.id)
+
+    def _visit_target(self, node):
+        # data[0] = 1、obj.attr = 1 会修改已有对象，视同重新定义 data / obj
+        if not isinstance(node.ctx, ast.Load) and self.depth == 0:
+            base = _base_name(node.value)
+            if base is not None:
+                self.defines.add(base)
+        self.generic_visit(node)
+
+    visit_Attribute = _visit_target
+    visit_Subscript = _visit_target
+
+    def visit_Call(self, node):
+        # data.append(1) 这类方法调用同样会修改已有对象
+        func = node.func
+        if self.depth == 0 and isinstance(func, ast.Attribute) and func.attr in self.MUTATING_METHODS:
+            base = _base_name(func.value)
+            if base is not None:
+                self.defines.add(base)
+        self.generic_visit(node)
+
+    def visit_AugAssign(self, node):
+        # x += 1 先读取 x 再重新绑定，依赖定义 x 的上游单元格
+        if isinstance(node.target, ast.Name):
+            self.uses.add(node.target.id)
+        self.generic_visit(node)
+
+    def _visit_scope(self, node):
+        if self.depth == 0 and hasattr(node, 'name'):
+            self.defines.add(node.name)
+        self.depth += 1
+        self.generic_visit(node)
+        self.depth -= 1
+
+    visit_FunctionDef = _visit_scope
+    visit_AsyncFunctionDef = _visit_scope
+    visit_ClassDef = _visit_scope
+    visit_Lambda = _visit_scope
+    # 推导式有自己的作用域，其中的循环变量不会泄漏到模块层
+    visit_ListComp = _visit_scope
+    visit_SetComp = _visit_scope
+    visit_DictComp = _visit_scope
+    visit_GeneratorExp = _visit_scope
+
+    def visit_Global(self, node):
+        self.defines.update(node.names)
+
+    def visit_Import(self, node):
+        if self.depth == 0:
+            for alias in node.names:
+                self.defines.add(alias.asname or alias.name.split('.')[0])
+
+    def visit_ImportFrom(self, node):
+        if self.depth == 0:
+            # from m import * 定义的名称无法静态得知，用 '*' 表示“可能定义任何名称”
+            self.defines.update(alias.asname or alias.name for alias in node.names)
+
+
+def cell_names(source):
+    """分析单元格定义和读取的名称，返回 (defines, uses)；有语法错误时返回 None"""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+    visitor = _CellNames()
+    visitor.visit(tree)
+    return visitor.defines, visitor.uses
+
+
+def _same_value(old, new):
+    """两次执行的输入值是否相同（未变化的数组映射是同一个对象）"""
+    if old is new:
+        return True
+    try:
+        return type(old) is type(new) and bool(old == new)
+    except Exception:
+        return False
+
+
+class CellState:
+    """单元格模式在会话中的状态：上次成功执行的各单元格源码哈希及输入值"""
+    def __init__(self):
+        self.hashes = []  # 按单元格顺序，未成功执行的为 None
+        self.inputs = None  # 上次执行时的输入变量
+
+    def plan(self, cells, inputs):
+        """决定哪些单元格需要执行：源码有变化或之前未成功执行的单元格，
+        以及读取了这些单元格（或有变化的输入）所定义名称的下游单元格。
+
+        需要执行的单元格若读取并修改已有的值（x += 1、data.append(...)），单独重跑会在上次的结果上
+        重复修改，此时从定义这些名称的上游单元格开始重跑。
+        """
+        digests = [hashlib.sha1(source.encode('utf-8', 'surrogatepass')).hexdigest() for _, source in cells]
+        names = [cell_names(source) for _, source in cells]
+        forced = set()  # 因下游原地修改而需要重跑的单元格
+        while True:
+            plan = self._plan(digests, names, inputs, forced)
+            upstream = set()
+            for index, (_, dirty) in enumerate(plan):
+                if not dirty or names[index] is None:
+                    continue
+                modified = names[index][0] & names[index][1]
+                for earlier in range(index - 1, -1, -1):
+                    if not modified:
+                        break
+                    if names[earlier] is None:
+                        continue
+                    if modified & names[earlier][0] and not plan[earlier][1]:
+                        upstream.add(earlier)
+                    modified -= names[earlier][0]
+            if not upstream:
+                return plan
+            forced |= upstream
+
+    def _plan(self, digests, names, inputs, forced):
+        """按源码哈希和输入的变化向下游传播，返回 [(源码哈希, 是否执行), ...]"""
+        if self.inputs is None:
+            dirty_names = set(inputs)
+        else:
+            dirty_names = {
+                name for name, value in inputs.items()
+                if name not in self.inputs or not _same_value(self.inputs[name], value)
+            }
+        plan = []
+        everything = False  # 上游重新执行了 from m import *，下游全部重跑
+        for index, digest in enumerate(digests):
+            cell = names[index]
+            dirty = (
+                everything or cell is None or index in forced
+                or index >= len(self.hashes) or self.hashes[index] != digest
+                or bool(cell[1] & dirty_names)
+            )
+            if dirty and cell is not None:
+                dirty_names |= cell[0]
+                everything = everything or '*' in cell[0]
+            plan.append((digest, dirty))
+        return plan
+
+
+def run_cells(code, variables, namespace, state, stdout=None, stderr=None):
+    """单元格增量执行：只执行有变化的单元格及其下游，其余沿用命名空间中已有的结果
+
+    返回的结果字典额外包含 cells 字段：[{'line', 'status', 'elapsed'}, ...]，
+    status 为 ran / skipped / error / pending（前面的单元格出错而未执行）。
+    """
+    start = time.perf_counter()
+    result = {'ok': True, 'compile_cached': True, 'elapsed': 0.0, 'output': '', 'cells': []}
+    try:
+        inputs = array_cache.resolve(variables)
+    except InputError as e:
+        result.update(ok=False, error=f"InputError: {e}")
+        return result
+    except MemoryError as e:
+        _record_error(result, e)
+        return result
+    cells = split_cells(code)
+    plan = state.plan(cells, inputs)
+    namespace.update(inputs)
+    state.inputs = inputs
+
+    hashes = []
+    for (line, source), (digest, dirty) in zip(cells, plan):
+        info = {'line': line + 1, 'status': 'skipped', 'elapsed': 0.0}
+        result['cells'].append(info)
+        if not result['ok']:
+            info['status'] = 'pending'
+            hashes.append(None)
+            continue
+        if not dirty:
+            hashes.append(digest)
+            continue
+        # 补足前导空行，使报错的行号与整段代码一致
+        cell_result = run_code('\n' * line + source, {}, stdout, stderr, namespace=namespace)
+        info['elapsed'] = cell_result['elapsed']
+        result['output'] += cell_result['output']
+        result['compile_cached'] = result['compile_cached'] and cell_result['compile_cached']
+        if cell_result['ok']:
+            info['status'] = 'ran'
+            hashes.append(digest)
+        else:
+            info['status'] = 'error'
+            hashes.append(None)
+            result.update(ok=False, error=f"单元格（第 {line + 1} 行）：{cell_result['error']}")
+            if 'memory_error' in cell_result:
+                result['memory_error'] = cell_result['memory_error']
+    state.hashes = hashes
+    result['elapsed'] = time.perf_counter() - start
+    return result
+
+
+def format_cells_summary(cells):
+    """单元格执行情况的一行摘要"""
+    ran = [c for c in cells if c['status'] in ('ran', 'error')]
+    skipped = sum(1 for c in cells if c['status'] == 'skipped')
+    text = f"单元格 {len(cells)} 个：执行 {len(ran)} 个，跳过未变化的 {skipped} 个"
+    if ran:
+        text += f"（执行耗时 {sum(c['elapsed'] for c in ran) * 1000:.1f} ms）"
+    return text
+
+
+def current_rss():
+    """当前进程的常驻内存（字节），无法获取时返回 None"""
+    if sys.platform == 'win32':
+        counters = _win_memory_counters()
+        return counters.WorkingSetSize if counters else None
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def peak_rss():
+    """当前进程常驻内存的历史峰值（字节），无法获取时返回 None"""
+    if sys.platform == 'win32':
+        counters = _win_memory_counters()
+        return counters.PeakWorkingSetSize if counters else None
+    try:
+        with open('/proc/self/status', 'rb') as f:
+            for line in f:
+                if line.startswith(b'VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def reset_peak_rss():
+    """把历史峰值重置为当前值（仅 Linux 支持），成功返回 True"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+_win_counters_type = None
+
+
+def _win_memory_counters():
+    """Windows 下通过 GetProcessMemoryInfo 读取内存计数"""
+    global _win_counters_type
+    import ctypes
+    from ctypes import wintypes
+    if _win_counters_type is None:
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ('cb', wintypes.DWORD),
+                ('PageFaultCount', wintypes.DWORD),
+                ('PeakWorkingSetSize', ctypes.c_size_t),
+                ('WorkingSetSize', ctypes.c_size_t),
+                ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                ('PagefileUsage', ctypes.c_size_t),
+                ('PeakPagefileUsage', ctypes.c_size_t),
+            ]
+        kernel32 = ctypes.windll.kernel32
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        kernel32.K32GetProcessMemoryInfo.argtypes = [
+            wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD
+        ]
+        kernel32.K32GetProcessMemoryInfo.restype = wintypes.BOOL
+        _win_counters_type = PROCESS_MEMORY_COUNTERS
+    counters = _win_counters_type()
+    counters.cb = ctypes.sizeof(counters)
+    kernel32 = ctypes.windll.kernel32
+    if not kernel32.K32GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+        return None
+    return counters
+
+
+class ResourceMeter:
+    """测量一次执行的 CPU 时间和峰值内存（相对执行前常驻内存的增量）
+
+    Linux 上执行前重置内核记录的峰值，结果精确；其他平台若本次执行没有刷新进程的历史峰值，
+    改用后台线程每 sample_interval 秒采样一次常驻内存，可能漏掉更短的尖峰。
+    """
+    def __init__(self, sample_interval=0.02):
+        self.sample_interval = sample_interval
+        self.sampler = None
+
+    def start(self):
+        self.rss_before = current_rss()
+        self.exact = self.rss_before is not None and reset_peak_rss()
+        self.peak_before = peak_rss()
+        self.sampled_peak = self.rss_before
+        self.stopped = threading.Event()
+        if self.rss_before is not None and not self.exact:
+            self.sampler = threading.Thread(target=self._sample_loop, daemon=True)
+            self.sampler.start()
+        self.cpu_start = time.process_time()
+
+    def _sample_loop(self):
+        while not self.stopped.wait(self.sample_interval):
+            rss = current_rss()
+            if rss is not None and rss > self.sampled_peak:
+                self.sampled_peak = rss
+
+    def stop(self):
+        """返回 {'cpu': CPU 秒数, 'peak_memory': 峰值内存增量（字节），无法测量时为 None}"""
+        cpu = time.process_time() - self.cpu_start
+        self.stopped.set()
+        if self.sampler is not None:
+            self.sampler.join()
+            self.sampler = None
+        if self.rss_before is None:
+            return {'cpu': cpu, 'peak_memory': None}
+
+        peak_after = peak_rss()
+        if self.exact or (peak_after is not None and self.peak_before is not None and peak_after > self.peak_before):
+            peak = peak_after
+        else:
+            peak = max(self.sampled_peak, current_rss() or 0)
+        return {'cpu': cpu, 'peak_memory': max(0, peak - self.rss_before)}
+
+
+def format_run_stats(result):
+    """一次执行的耗时、CPU 时间和峰值内存摘要"""
+    text = f"⏱ {result['elapsed'] * 1000:.2f} ms"
+    if 'cpu' in result:
+        text += f" · CPU {result['cpu'] * 1000:.2f} ms"
+    if result.get('peak_memory') is not None:
+        text += f" · 峰值内存 +{format_size(result['peak_memory'])}"
+    return text
+
+
+def run_sweep_chunk(code, points, limits=None):
+    """对一组输入依次执行同一段代码（编译缓存保证只编译一次），返回每次的结果
+
+    指定 limits（RunLimits）时每个取值都单独受 CPU 时间和输出大小的限制。
+    """
+    if limits is None:
+        return [run_code(code, variables, result_name='result') for variables in points]
+    results = []
+    for variables in points:
+        capture = _LimitedCapture(limits)
+        result = limits.run(lambda: run_code(code, variables, capture, capture, 'result'))
+        result['output'] = capture.getvalue()
+        results.append(result)
+    return results
+
+
+class _LimitedCapture(StringIO):
+    """收集输出的 StringIO，写入前先向 RunLimits 记账"""
+    def __init__(self, limits):
+        super().__init__()
+        self.limits = limits
+
+    def write(self, text):
+        if not isinstance(text, str):
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        self.limits.charge(len(text))
+        return super().write(text)
+
+
+class _NullWriter(TextIOBase):
+    """丢弃写入内容、只统计字符数的文件对象"""
+    def __init__(self):
+        self.count = 0
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self.count += len(text)
+        return len(text)
+
+
+def _compile_cached(source):
+    """从编译缓存取 code 对象，源码有语法错误时抛出"""
+    compiled, _ = code_cache.get(source)
+    if isinstance(compiled, Exception):
+        raise compiled.with_traceback(None)
+    return compiled
+
+
+def _time_exec(compiled, namespace, loops):
+    """执行 loops 次并返回总耗时；每次在 namespace 的浅拷贝中执行，上一次的赋值不会带到下一次"""
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(loops):
+            exec(compiled, dict(namespace))
+        return time.perf_counter() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def run_benchmark(code, variables, repeat=7, min_time=0.2):
+    """按 timeit 的方式测量代码的单次耗时，返回结果字典
+
+    代码只编译一次，并像普通执行一样作为模块级代码运行（不像 timeit 那样包进函数体，
+    x = x * 2、from m import *、global 的含义都不变）。循环次数按 timeit 的自动校准规则
+    （1, 2, 5, 10, 20, 50...）增加到单轮耗时不少于 min_time 秒，再执行 repeat 轮，
+    结果扣除复制命名空间等循环本身的开销。代码含 # %% 单元格时，最后一个单元格为被测语句，
+    之前的部分作为准备代码只执行一次。计时期间关闭垃圾回收，输出被丢弃。
+    """
+    result = {'ok': True, 'benchmark': True, 'output': '', 'elapsed': 0.0}
+    cells = split_cells(code)
+    if len(cells) > 1:
+        setup = ''.join(source for _, source in cells[:-1])
+        stmt = cells[-1][1]
+    else:
+        setup, stmt = '', code
+
+    sink = _NullWriter()
+    old_stdout, old_stderr = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = sink
+    start = time.perf_counter()
+    try:
+        compiled = _compile_cached(stmt)
+        namespace = array_cache.resolve(variables)
+        exec(_compile_cached(setup), namespace)
+        base = 1
+        # 与 Timer.autorange 相同的校准，但以 min_time 为目标
+        while True:
+            for factor in (1, 2, 5):
+                loops = base * factor
+                if _time_exec(compiled, namespace, loops) >= min_time:
+                    break
+            else:
+                base *= 10
+                continue
+            break
+        overhead = min(_time_exec(_compile_cached(''), namespace, loops) for _ in range(3))
+        times = [max(0.0, _time_exec(compiled, namespace, loops) - overhead) / loops for _ in range(repeat)]
+        result.update(
+            loops=loops, repeat=repeat, best=min(times), median=statistics.median(times),
+            stdev=statistics.stdev(times) if len(times) > 1 else 0.0, times=times
+        )
+    except SystemExit as e:
+        result.update(ok=False, error=f"SystemExit: {e.code}")
+    except ResourceLimitError as e:
+        result.update(ok=False, error=str(e))
+    except Exception as e:
+        _record_error(result, e)
+    finally:
+        sys.stdout, sys.stderr = old_stdout, old_stderr
+    result['elapsed'] = time.perf_counter() - start
+    result['ignored_output'] = sink.count
+    return result
+
+
+def format_duration(seconds):
+    """把秒数格式化为 ns / µs / ms / s"""
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('µs', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def format_benchmark(result):
+    """基准测试结果的一行摘要"""
+    text = (
+        f"{result['loops']:,} 次循环 × {result['repeat']} 轮，每次最快 {format_duration(result['best'])}，"
+        f"中位数 {format_duration(result['median'])}，标准差 {format_duration(result['stdev'])}"
+    )
+    if result['ignored_output']:
+        text += f"（计时期间忽略了 {result['ignored_output']:,} 个字符的输出）"
+    return text
+
+
+def percentile(sorted_values, q):
+    """最近秩法求百分位数（sorted_values 需已排序）"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def sweep_stats(rows, wall_time):
+    """批量执行的汇总：次数、失败数、吞吐（次/秒）和单次耗时百分位"""
+    latencies = sorted(row['elapsed'] for row in rows if row is not None)
+    return {
+        'count': len(rows),
+        'failed': sum(1 for row in rows if row is None or not row['ok']),
+        'wall': wall_time,
+        'throughput': len(rows) / wall_time if wall_time > 0 else 0.0,
+        'p50': percentile(latencies, 50),
+        'p90': percentile(latencies, 90),
+        'p99': percentile(latencies, 99),
+        'max': latencies[-1] if latencies else 0.0,
+    }
+
+
+def format_sweep_stats(stats):
+    """汇总信息的单行文本"""
+    return (
+        f"共 {stats['count']} 次，失败 {stats['failed']} 次，总耗时 {stats['wall']:.3f} s，"
+        f"吞吐 {stats['throughput']:,.0f} 次/秒，单次耗时 p50 {stats['p50'] * 1000:.3f} ms / "
+        f"p90 {stats['p90'] * 1000:.3f} ms / p99 {stats['p99'] * 1000:.3f} ms"
+    )
+
+
+def write_sweep_csv(f, names, points, rows):
+    """把批量结果写成 CSV：各输入变量、result、输出、错误、耗时"""
+    writer = csv.writer(f)
+    writer.writerow(names + ['result', 'output', 'error', 'elapsed_ms'])
+    for variables, row in zip(points, rows):
+        writer.writerow([variables[name] for name in names] + [
+            row.get('value', ''),
+            row.get('output', '').rstrip('\n'),
+            row.get('error', ''),
+            f"{row.get('elapsed', 0.0) * 1000:.4f}",
+        ])
+
+
+class OutputChannel:
+    """执行进程一侧的输出通道：缓冲 stdout/stderr，定时成批发回父进程"""
+    def __init__(self, conn, interval=0.03, max_buffer=65536):
+        self.conn = conn
+        self.interval = interval
+        self.max_buffer = max_buffer
+        self.lock = threading.Lock()
+        self.chunks = []  # [(流名称, 文本), ...]
+        self.size = 0
+        self.flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self.flusher.start()
+
+    def write(self, name, text):
+        with self.lock:
+            self.chunks.append((name, text))
+            self.size += len(text)
+            if self.size >= self.max_buffer:
+                self._flush_locked()
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def send(self, message):
+        """先发出缓冲中的输出，再发送消息，保证顺序"""
+        with self.lock:
+            self._flush_locked()
+            self.conn.send(message)
+
+    def _flush_locked(self):
+        if not self.chunks:
+            return
+        # 合并相邻的同名输出，减少消息数量
+        merged = []
+        for name, text in self.chunks:
+            if merged and merged[-1][0] == name:
+                merged[-1][1].append(text)
+            else:
+                merged.append((name, [text]))
+        self.chunks = []
+        self.size = 0
+        self.conn.send(('output', [(name, ''.join(parts)) for name, parts in merged]))
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except (OSError, ValueError):
+                break
+
+
+def physical_memory():
+    """物理内存总量（字节），无法获取时返回 None"""
+    if sys.platform == 'win32':
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong)] + [
+                (name, ctypes.c_ulonglong) for name in (
+                    'ullTotalPhys', 'ullAvailPhys', 'ullTotalPageFile', 'ullAvailPageFile',
+                    'ullTotalVirtual', 'ullAvailVirtual', 'ullAvailExtendedVirtual',
+                )
+            ]
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(status)
+        if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return None
+        return status.ullTotalPhys
+    try:
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _win_limit_memory(limit):
+    """Windows 下把当前进程放进限制了提交内存的作业对象，返回作业句柄，失败时返回 None"""
+    import ctypes
+    from ctypes import wintypes
+
+    class BASIC_LIMIT_INFORMATION(ctypes.Structure):
+        _fields_ = [
+            ('PerProcessUserTimeLimit', ctypes.c_int64),
+            ('PerJobUserTimeLimit', ctypes.c_int64),
+            ('LimitFlags', wintypes.DWORD),
+            ('MinimumWorkingSetSize', ctypes.c_size_t),
+            ('MaximumWorkingSetSize', ctypes.c_size_t),
+            ('ActiveProcessLimit', wintypes.DWORD),
+            ('Affinity', ctypes.c_size_t),
+            ('PriorityClass', wintypes.DWORD),
+            ('SchedulingClass', wintypes.DWORD),
+        ]
+
+    class EXTENDED_LIMIT_INFORMATION(ctypes.Structure):
+        _fields_ = [
+            ('BasicLimitInformation', BASIC_LIMIT_INFORMATION),
+            ('IoInfo', ctypes.c_ulonglong * 6),
+            ('ProcessMemoryLimit', ctypes.c_size_t),
+            ('JobMemoryLimit', ctypes.c_size_t),
+            ('PeakProcessMemoryUsed', ctypes.c_size_t),
+            ('PeakJobMemoryUsed', ctypes.c_size_t),
+        ]
+
+    JOB_OBJECT_LIMIT_PROCESS_MEMORY = 0x100
+    JobObjectExtendedLimitInformation = 9
+    kernel32 = ctypes.windll.kernel32
+    kernel32.CreateJobObjectW.restype = wintypes.HANDLE
+    kernel32.SetInformationJobObject.argtypes = [wintypes.HANDLE, ctypes.c_int, ctypes.c_void_p, wintypes.DWORD]
+    kernel32.AssignProcessToJobObject.argtypes = [wintypes.HANDLE, wintypes.HANDLE]
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+
+    job = kernel32.CreateJobObjectW(None, None)
+    if not job:
+        return None
+    info = EXTENDED_LIMIT_INFORMATION()
+    info.BasicLimitInformation.LimitFlags = JOB_OBJECT_LIMIT_PROCESS_MEMORY
+    info.ProcessMemoryLimit = limit
+    if not kernel32.SetInformationJobObject(job, JobObjectExtendedLimitInformation, ctypes.byref(info), ctypes.sizeof(info)):
+        return None
+    if not kernel32.AssignProcessToJobObject(job, kernel32.GetCurrentProcess()):
+        return None
+    return job
+
+
+class RunLimits:
+    """执行进程的资源限制：内存上限作用于整个进程，CPU 时间和输出大小按单次执行计算
+
+    POSIX 上用 resource.setrlimit 只调整软限制（硬限制不变，执行结束后可以恢复）：内存在 Linux 上限制可写的
+    私有内存（只读映射的数组文件不计入），其他平台限制地址空间，超出时分配失败、抛出 MemoryError。
+    CPU 时间用 setitimer(ITIMER_PROF) 计时，到期后每 0.1 秒发送一次 SIGPROF，信号处理中抛出 ResourceLimitError。
+    Windows 上内存由作业对象限制，CPU 时间由监视线程检查、通过 interrupt_main 中断主线程。
+    正在向父进程发送消息时不中断（避免管道里留下半条消息），等下一次信号再处理。
+    """
+    def __init__(self, config, channel):
+        try:
+            import resource
+        except ImportError:
+            resource = None
+        self.resource = resource
+        self.channel = channel
+        memory = config.get("memory_limit_mb", DEFAULT_CONFIG["memory_limit_mb"])
+        if memory is None:
+            total = physical_memory()
+            self.memory = int(total * 0.75) if total else 0
+        else:
+            self.memory = int(memory * 1024 * 1024)
+        self.cpu = config.get("cpu_limit_s", 0) or 0
+        self.output = int((config.get("output_limit_mb", 0) or 0) * 1024 * 1024)
+        self.active = False  # 是否正在执行受限的任务
+        self.cpu_exceeded = False
+        self.cpu_budget = self.cpu_deadline = 0  # 本次执行的 CPU 时间上限，及到期时的 process_time()
+        self.written = 0  # 本次执行已输出的字符数
+        self.job = None  # Windows 作业对象句柄，需保持打开
+        self.watchdog = None
+
+    def install(self):
+        """执行进程启动时调用一次：设置内存上限，注册 CPU 超时的处理"""
+        resource = self.resource
+        if self.memory:
+            if resource is not None:
+                # Linux 的 RLIMIT_DATA 只计可写的私有内存，只读映射的大数组文件不占额度；
+                # 其他平台的 RLIMIT_DATA 不含 mmap 分配的内存，只能限制整个地址空间
+                kind = resource.RLIMIT_DATA if sys.platform.startswith('linux') else resource.RLIMIT_AS
+                soft, hard = resource.getrlimit(kind)
+                limit = self.memory if hard == resource.RLIM_INFINITY else min(self.memory, hard)
+                try:
+                    resource.setrlimit(kind, (limit, hard))
+                except (ValueError, OSError):
+                    self.memory = 0
+            elif sys.platform == 'win32':
+                self.job = _win_limit_memory(self.memory)
+                if self.job is None:
+                    self.memory = 0
+            else:
+                self.memory = 0
+        if self.cpu:
+            if hasattr(signal, 'setitimer'):
+                signal.signal(signal.SIGPROF, self._on_cpu_limit)
+            else:
+                signal.signal(signal.SIGINT, self._on_cpu_limit)
+
+    def start(self, scale=1):
+        """一次执行开始：从当前 CPU 时间起算期限（cpu_limit_s 的 scale 倍），输出计数清零"""
+        self.written = 0
+        self.cpu_exceeded = False
+        self.cpu_budget = self.cpu * scale
+        if self.cpu:
+            deadline = self.cpu_deadline = time.process_time() + self.cpu_budget
+            if hasattr(signal, 'setitimer'):
+                signal.setitimer(signal.ITIMER_PROF, self.cpu_budget, 0.1)
+            else:
+                stopped = threading.Event()
+                self.watchdog = (threading.Thread(target=self._watch_cpu, args=(deadline, stopped), daemon=True), stopped)
+                self.watchdog[0].start()
+        self.active = True
+
+    def stop(self):
+        """一次执行结束：撤销 CPU 时间期限"""
+        self.active = False
+        if self.cpu:
+            if hasattr(signal, 'setitimer'):
+                signal.setitimer(signal.ITIMER_PROF, 0)
+            elif self.watchdog is not None:
+                thread, stopped = self.watchdog
+                stopped.set()
+                thread.join()
+                self.watchdog = None
+
+    def _watch_cpu(self, deadline, stopped):
+        while not stopped.wait(0.05):
+            if time.process_time() > deadline:
+                self.cpu_exceeded = True
+                _thread.interrupt_main()
+                # 仍未结束时每秒再中断一次
+                stopped.wait(1)
+
+    def _on_cpu_limit(self, signum, frame):
+        if signum == signal.SIGINT and not self.cpu_exceeded:
+            signal.default_int_handler(signum, frame)
+        if not self.active or self.channel.lock.locked() or time.process_time() < self.cpu_deadline:
+            return
+        raise ResourceLimitError(f"CPU 时间超出限制（上限 {self.cpu_budget:g} 秒），已中止本次执行；可在配置 cpu_limit_s 中调整")
+
+    def charge(self, size):
+        """记入一次输出，超出上限时抛出 ResourceLimitError（超出的部分不再发回父进程）"""
+        if not self.active or not self.output:
+            return
+        self.written += size
+        if self.written > self.output:
+            raise ResourceLimitError(
+                f"输出超出限制（上限 {format_size(self.output)}），已中止本次执行；可在配置 output_limit_mb 中调整"
+            )
+
+    def run(self, task, scale=1):
+        """在限制下调用 task()，返回结果字典；内存不足时把错误换成说明上限的提示
+
+        scale 为 CPU 时间上限的倍数，基准测试与墙钟超时一样按轮数放宽。
+        """
+        self.start(scale)
+        try:
+            result = task()
+        except ResourceLimitError as e:
+            # 信号恰好落在执行前后的簿记代码里
+            result = {'ok': False, 'output': '', 'elapsed': 0.0, 'error': str(e)}
+        finally:
+            self.stop()
+        memory_error = result.pop('memory_error', None)
+        if self.memory and memory_error:
+            # 保留单元格模式等加在异常信息前面的说明
+            prefix = result['error'][:-len(memory_error)]
+            result['error'] = prefix + (
+                f"内存超出限制（上限 {format_size(self.memory)}），已中止本次执行；可在配置 memory_limit_mb 中调整"
+            )
+        return result
+
+
+class _ChannelWriter(TextIOBase):
+    """替换 sys.stdout / sys.stderr 的文件对象"""
+    def __init__(self, channel, name, limits=None):
+        self.channel = channel
+        self.name = name
+        self.limits = limits
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if not isinstance(text, str):
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        if text:
+            if self.limits is not None:
+                self.limits.charge(len(text))
+            self.channel.write(self.name, text)
+        return len(text)
+
+    def flush(self):
+        self.channel.flush()
+
+
+def _worker_loop(conn, config, preload=True):
+    """常驻执行进程：（preload 为 True 时）预导入模块后循环接收并执行任务"""
+    code_cache.maxsize = config.get("code_cache_size", DEFAULT_CONFIG["code_cache_size"])
+    report = import_modules(config.get("preload_modules", [])) if preload else None
+    channel = OutputChannel(conn)
+    limits = RunLimits(config, channel)
+    limits.install()
+    stdout = _ChannelWriter(channel, 'stdout', limits)
+    stderr = _ChannelWriter(channel, 'stderr', limits)
+    channel.send(('ready', os.getpid()))
+    if report and report['modules']:
+        channel.send(('prewarmed', report))
+    session = None  # 会话模式的命名空间，首次会话执行时创建
+    cell_state = None  # 单元格模式的状态，与会话命名空间对应
+
+    while True:
+        try:
+            kind, payload = conn.recv()
+        except (EOFError, OSError):
+            break
+        if kind == 'run':
+            meter = ResourceMeter()
+            meter.start()
+            if payload.get('session'):
+                fresh = session is None
+                if fresh:
+                    session = new_namespace()
+                if payload.get('cells'):
+                    if cell_state is None:
+                        cell_state = CellState()
+                    result = limits.run(lambda: run_cells(
+                        payload['code'], payload['variables'], session, cell_state, stdout, stderr
+                    ))
+                else:
+                    # 普通会话执行可能改动任意变量，之后的单元格执行需全部重跑
+                    cell_state = None
+                    result = limits.run(lambda: run_code(
+                        payload['code'], payload['variables'], stdout, stderr,
+                        result_name=payload.get('result_name'), namespace=session
+                    ))
+                result.update(session_fresh=fresh, variables=describe_namespace(session))
+            else:
+                result = limits.run(lambda: run_code(
+                    payload['code'], payload['variables'], stdout, stderr, payload.get('result_name')
+                ))
+            result.update(meter.stop())
+            channel.send(('result', result))
+        elif kind == 'reset':
+            session = cell_state = None
+        elif kind == 'prewarm':
+            channel.send(('prewarmed', import_modules(payload['modules'])))
+        elif kind == 'sweep':
+            channel.send(('sweep_result', run_sweep_chunk(payload['code'], payload['points'], limits)))
+        elif kind == 'profile':
+            meter = ResourceMeter()
+            meter.start()
+            result = limits.run(lambda: run_profile(payload['code'], payload['variables'], payload['mode'], stdout, stderr))
+            result.update(meter.stop())
+            channel.send(('result', result))
+        elif kind == 'bench':
+            gc.collect()
+            # 输出被丢弃，只受 CPU 时间限制（按轮数放宽）
+            repeat = payload['repeat']
+            channel.send(('result', limits.run(
+                lambda: run_benchmark(payload['code'], payload['variables'], repeat), scale=repeat + 1
+            )))
+        elif kind == 'stop':
+            break
+    conn.close()
+
+
+_start_lock = threading.Lock()
+
+
+def _start_process(process):
+    """启动 spawn 子进程
+
+    spawn 默认会在子进程中重新导入主脚本（sidepython.py 会因此加载 Qt），子进程只需要本模块，
+    启动时暂时隐藏主模块；替换 sys.modules 的过程加锁，后台线程启动子进程时也不会互相覆盖。
+    """
+    with _start_lock:
+        main_module = sys.modules.get('__main__')
+        sys.modules['__main__'] = types.ModuleType('__main__')
+        try:
+            process.start()
+        finally:
+            sys.modules['__main__'] = main_module
+
+
+def _syntax_loop(conn):
+    """语法检查进程：循环接收源码，返回 check_syntax 的结果"""
+    while True:
+        try:
+            source = conn.recv()
+        except (EOFError, OSError):
+            break
+        if source is None:
+            break
+        conn.send(check_syntax(source))
+
+
+class SyntaxCheckProcess:
+    """在独立进程中做语法检查
+
+    编译几万行的源码要持有 GIL 几百毫秒，放在界面进程的线程里同样会卡住界面；
+    在子进程中编译时，调用方线程阻塞在管道读取上，不占用 GIL。
+    """
+    def __init__(self):
+        self.process = None
+        self.conn = None
+
+    def check(self, source):
+        """阻塞直到返回 check_syntax 的结果；进程尚未启动或已退出时（重新）启动"""
+        for _ in range(2):
+            if self.process is None or not self.process.is_alive():
+                self._start()
+            try:
+                self.conn.send(source)
+                return self.conn.recv()
+            except (EOFError, OSError):
+                self.close()
+        # 子进程反复启动失败时退回在本进程中检查
+        return check_syntax(source)
+
+    def _start(self):
+        self.close()
+        self.conn, child_conn = _mp.Pipe()
+        self.process = _mp.Process(target=_syntax_loop, args=(child_conn,), daemon=True)
+        _start_process(self.process)
+        child_conn.close()
+
+    def close(self):
+        """结束检查进程"""
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(0.5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+        self.process = self.conn = None
+
+
+class WorkerProcess:
+    """常驻执行进程在父进程一侧的句柄"""
+    def __init__(self, config, preload=True):
+        self.conn, child_conn = _mp.Pipe()
+        self.process = _mp.Process(
+            target=_worker_loop,
+            args=(child_conn, config, preload),
+            daemon=True
+        )
+        _start_process(self.process)
+        child_conn.close()
+        self.ready = False  # 启动（及启动时的预导入）是否完成
+        self.busy = False  # 是否正在执行任务
+        self.warming = False  # 是否正在后台预导入模块
+        self.import_report = None  # 最近一次预导入的耗时报告
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def handle_message(self, kind, payload):
+        """处理与具体任务无关的状态消息（就绪、预导入完成）"""
+        if kind == 'ready':
+            self.ready = True
+        elif kind == 'prewarmed':
+            self.warming = False
+            self.import_report = payload
+
+    def check_ready(self):
+        """非阻塞地读取状态消息（只对空闲进程调用），返回能否立即开始执行"""
+        try:
+            while self.conn.poll():
+                self.handle_message(*self.conn.recv())
+        except (EOFError, OSError):
+            return False
+        return self.ready and not self.warming
+
+    def kill(self):
+        """终止进程并关闭管道"""
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(1)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        """请求进程正常退出"""
+        try:
+            self.conn.send(('stop', None))
+        except (OSError, ValueError):
+            pass
+        self.process.join(0.5)
+        self.kill()
+
+
+class PoolRun:
+    """在池中某个常驻进程里执行的一次任务"""
+    kind = 'run'  # 发给执行进程的消息类型
+
+    def __init__(self, pool, code, variables, timeout=0, session=False, cells=False, result_name=None):
+        self.pool = pool
+        self.code = code
+        self.variables = variables
+        self.timeout = timeout
+        self.session = session or cells  # 是否在会话进程中执行（保留命名空间）
+        self.cells = cells  # 单元格增量执行，依赖会话命名空间
+        self.result_name = result_name  # 执行后取其 repr 作为结果的变量名
+        self.worker = None
+        self.started_at = None
+        self.pending_output = []  # 尚未取走的流式输出 [(流名称, 文本), ...]
+
+    def start(self):
+        """把任务发送给一个空闲进程"""
+        self.worker = self.pool.acquire_session() if self.session else self.pool.acquire()
+        self.worker.conn.send((self.kind, self.payload()))
+        self.started_at = time.monotonic()
+
+    def payload(self):
+        """发给执行进程的任务内容"""
+        return {
+            'code': self.code, 'variables': self.variables, 'session': self.session, 'cells': self.cells,
+            'result_name': self.result_name,
+        }
+
+    def elapsed(self):
+        """已运行的秒数"""
+        if self.started_at is None:
+            return 0.0
+        return time.monotonic() - self.started_at
+
+    def read_output(self):
+        """取走已收到的全部流式输出"""
+        output, self.pending_output = self.pending_output, []
+        return output
+
+    def poll(self, budget=0.01):
+        """检查执行状态，完成时返回结果字典，仍在运行时返回 None
+
+        每次最多花费 budget 秒读取管道，避免大量输出占满调用方的事件循环；
+        读到的输出全部交给调用方，由显示端自行截断，执行进程不会因界面处理不及而被阻塞。
+        """
+        worker = self.worker
+        alive = worker.is_alive()
+        deadline = time.monotonic() + budget
+
+        try:
+            while worker.conn.poll():
+                kind, payload = worker.conn.recv()
+                if kind == 'output':
+                    self.pending_output.extend(payload)
+                elif kind == 'result':
+                    self.pool.release(worker)
+                    return payload
+                else:
+                    worker.handle_message(kind, payload)
+                if time.monotonic() > deadline:
+                    return None
+        except (EOFError, OSError):
+            alive = False
+
+        if not alive:
+            exitcode = worker.process.exitcode
+            self.pool.discard(worker)
+            return {'ok': False, 'output': '', 'error': f"执行进程异常退出（退出码 {exitcode}），已自动重启{self.lost_note()}"}
+
+        if self.timeout and self.elapsed() > self.timeout:
+            self.terminate()
+            return {'ok': False, 'output': '', 'error': f"执行超时（超过 {self.timeout} 秒），已终止{self.lost_note()}"}
+
+        return None
+
+    def terminate(self):
+        """终止执行：杀掉所在进程，由进程池补充新进程"""
+        if self.worker is not None:
+            self.pool.discard(self.worker)
+
+    def lost_note(self):
+        """会话进程被终止时附在错误信息后的提示"""
+        return "，会话变量已丢失" if self.session else ""
+
+    def progress_text(self):
+        return f"运行中… {self.elapsed():.1f}s"
+
+
+class BenchmarkRun(PoolRun):
+    """在空闲的常驻进程（而不是会话进程）中执行的一次基准测试"""
+    kind = 'bench'
+
+    def __init__(self, pool, code, variables, timeout=0, repeat=7):
+        # 每一轮最多相当于一次普通执行，超时按轮数放宽
+        super().__init__(pool, code, variables, timeout * (repeat + 1))
+        self.repeat = repeat
+
+    def payload(self):
+        return {'code': self.code, 'variables': self.variables, 'repeat': self.repeat}
+
+    def progress_text(self):
+        return f"基准测试中… {self.elapsed():.1f}s"
+
+
+class ProfileRun(PoolRun):
+    """在空闲的常驻进程中以性能分析方式完整执行一次（总是使用全新的命名空间）"""
+    kind = 'profile'
+
+    def __init__(self, pool, code, variables, timeout=0, mode='lines'):
+        super().__init__(pool, code, variables, timeout)
+        self.mode = mode  # lines：逐行统计；calls：cProfile 函数调用统计
+
+    def payload(self):
+        return {'code': self.code, 'variables': self.variables, 'mode': self.mode}
+
+    def progress_text(self):
+        return f"性能分析中… {self.elapsed():.1f}s"
+
+
+class SweepRun:
+    """批量执行：把参数网格分块分发给多个执行进程并汇总结果"""
+    kind = 'sweep'  # 发给执行进程的消息类型
+    def __init__(self, pool, code, names, points, timeout=0, workers=0):
+        self.pool = pool
+        self.code = code
+        self.names = names
+        self.points = points
+        self.timeout = timeout  # 单次执行的超时，一个分块允许 timeout * 分块大小
+        self.workers = min(workers or os.cpu_count() or 1, max(1, len(points)))
+        self.rows = [None] * len(points)
+        self.chunks = deque()  # 待分发的 (起始下标, 数量)
+        self.active = {}  # 执行进程 -> (起始下标, 数量, 开始时间)
+        self.done = 0
+        self.started_at = None
+        self.reserved = 0  # 为本次批量执行临时扩充的进程数
+
+    def start(self):
+        """切分网格并开始分发；分块数取并行数的 4 倍以平衡负载"""
+        size = max(1, math.ceil(len(self.points) / (self.workers * 4)))
+        self.chunks.extend((i, min(size, len(self.points) - i)) for i in range(0, len(self.points), size))
+        self.started_at = time.monotonic()
+        # 执行期间保留扩充出的进程，各分块复用，不必每块都新建
+        self.reserved = self.pool.reserve(self.workers)
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.chunks and len(self.active) < self.workers:
+            start, count = self.chunks.popleft()
+            worker = self.pool.acquire()
+            worker.conn.send((self.kind, {'code': self.code, 'points': self.points[start:start + count]}))
+            self.active[worker] = (start, count, time.monotonic())
+
+    def _fail_chunk(self, start, count, error):
+        for i in range(start, start + count):
+            self.rows[i] = {'ok': False, 'output': '', 'error': error, 'elapsed': 0.0}
+        self.done += count
+
+    def elapsed(self):
+        """已运行的秒数"""
+        if self.started_at is None:
+            return 0.0
+        return time.monotonic() - self.started_at
+
+    def read_output(self):
+        # 批量模式的输出保存在每行结果中，不做流式显示
+        return []
+
+    def poll(self, budget=0.01):
+        """收集已完成的分块，全部完成时返回汇总结果，否则返回 None"""
+        deadline = time.monotonic() + budget
+        for worker, (start, count, chunk_started) in list(self.active.items()):
+            alive = worker.is_alive()
+            finished = False
+            try:
+                while not finished and worker.conn.poll():
+                    kind, payload = worker.conn.recv()
+                    if kind == 'sweep_result':
+                        self.rows[start:start + count] = payload
+                        self.done += count
+                        finished = True
+                    else:
+                        worker.handle_message(kind, payload)
+            except (EOFError, OSError):
+                alive = False
+
+            if finished:
+                del self.active[worker]
+                self.pool.release(worker)
+            elif not alive:
+                del self.active[worker]
+                self.pool.discard(worker)
+                self._fail_chunk(start, count, f"执行进程异常退出（退出码 {worker.process.exitcode}）")
+            elif self.timeout and time.monotonic() - chunk_started > self.timeout * count:
+                del self.active[worker]
+                self.pool.discard(worker)
+                self._fail_chunk(start, count, f"执行超时（超过 {self.timeout} 秒），已终止")
+            if time.monotonic() > deadline:
+                break
+
+        self._dispatch()
+        if self.active or self.chunks:
+            return None
+
+        self._unreserve()
+        stats = sweep_stats(self.rows, self.elapsed())
+        return {
+            'ok': True,
+            'sweep': True,
+            'names': self.names,
+            'points': self.points,
+            'rows': self.rows,
+            'stats': stats,
+        }
+
+    def terminate(self):
+        """终止所有正在执行的分块"""
+        for worker in list(self.active):
+            self.pool.discard(worker)
+        self.active.clear()
+        self.chunks.clear()
+        self._unreserve()
+
+    def _unreserve(self):
+        """归还临时扩充的进程数，池缩回原来的大小"""
+        self.pool.unreserve(self.reserved)
+        self.reserved = 0
+
+    def progress_text(self):
+        return f"批量执行 {self.done}/{len(self.points)} · {self.elapsed():.1f}s"
+
+
+class WorkerPool:
+    """常驻执行进程池，崩溃或被终止的进程会自动补充"""
+    def __init__(self, config=None, preload=True):
+        self.config = dict(DEFAULT_CONFIG, **(config or {}))
+        self.size = max(1, self.config["workers"])
+        self.workers = []
+        self.session_worker = None  # 会话模式专用进程，命名空间在各次执行间保留
+        self.extra = 0  # 批量执行期间临时保留的额外进程数
+        # 新进程启动时是否立即预导入 preload_modules；为 False 时等 prewarm() 时再导入
+        self.preload = preload
+
+    def start(self):
+        """补足进程数量（子进程在后台完成启动和预导入）"""
+        while len(self.workers) < self.size:
+            self.workers.append(WorkerProcess(self.config, self.preload))
+
+    def prewarm(self):
+        """让现有进程在后台导入 preload_modules，此后新建的进程启动时即导入"""
+        self.preload = True
+        modules = self.config.get("preload_modules", [])
+        if not modules:
+            return
+        for worker in self.workers + [self.session_worker]:
+            if worker is None or not worker.is_alive():
+                continue
+            try:
+                # 繁忙的进程会在当前任务结束后处理
+                worker.conn.send(('prewarm', {'modules': modules}))
+            except (OSError, ValueError):
+                continue
+            worker.warming = True
+
+    def import_report(self):
+        """预导入的耗时报告（各进程导入的模块相同，取任意一个），尚未完成时返回 None"""
+        for worker in self.workers + [self.session_worker]:
+            if worker is None:
+                continue
+            if not worker.busy:
+                worker.check_ready()
+            if worker.import_report is not None:
+                return worker.import_report
+        return None
+
+    def acquire(self):
+        """取出一个空闲进程，优先选择已完成预导入的"""
+        for worker in [w for w in self.workers if not w.is_alive()]:
+            self.discard(worker)
+
+        idle = [w for w in self.workers if not w.busy]
+        ready = [w for w in idle if w.check_ready()]
+        if ready:
+            worker = ready[0]
+        elif idle:
+            worker = idle[0]
+        else:
+            # 全部繁忙时临时扩容，归还后回收
+            worker = WorkerProcess(self.config, self.preload)
+            self.workers.append(worker)
+
+        worker.busy = True
+        return worker
+
+    def acquire_session(self):
+        """取出会话进程，尚未创建或已退出时新建（此时会话从空命名空间开始）"""
+        worker = self.session_worker
+        if worker is None or not worker.is_alive():
+            if worker is not None:
+                worker.kill()
+            worker = self.session_worker = WorkerProcess(self.config, self.preload)
+        worker.busy = True
+        return worker
+
+    def reset_session(self):
+        """清空会话命名空间；会话进程繁忙或已退出时直接结束它"""
+        worker = self.session_worker
+        if worker is None:
+            return
+        if worker.busy or not worker.is_alive():
+            self.discard(worker)
+            return
+        try:
+            worker.conn.send(('reset', None))
+        except (OSError, ValueError):
+            self.discard(worker)
+
+    def release(self, worker):
+        """任务完成后归还进程"""
+        worker.busy = False
+        if worker is not self.session_worker and len(self.workers) > self.size + self.extra:
+            self.discard(worker, refill=False)
+
+    def reserve(self, count):
+        """在 count 个进程并行的任务期间保留临时扩充的进程，返回额外保留的数量，结束后交给 unreserve"""
+        extra = max(0, count - self.size)
+        self.extra += extra
+        return extra
+
+    def unreserve(self, extra):
+        """取消 reserve 的保留，结束多出来的空闲进程"""
+        self.extra -= extra
+        for worker in [w for w in self.workers if not w.busy]:
+            if len(self.workers) <= self.size + self.extra:
+                break
+            self.discard(worker, refill=False)
+
+    def discard(self, worker, refill=True):
+        """移除并终止一个进程"""
+        worker.kill()
+        if worker is self.session_worker:
+            # 会话进程不参与补充，下次会话执行时再创建
+            self.session_worker = None
+            return
+        if worker in self.workers:
+            self.workers.remove(worker)
+        if refill:
+            self.start()
+
+    def run(self, code, variables, timeout=0, session=False, cells=False, result_name=None):
+        """提交一次执行，返回 PoolRun；session 为 True 时在会话进程中执行，
+        cells 为 True 时按 # %% 单元格增量执行（同样使用会话进程）；
+        指定 result_name 时该变量的 repr 放在结果的 value 字段"""
+        run = PoolRun(self, code, variables, timeout, session, cells, result_name)
+        run.start()
+        return run
+
+    def run_profile(self, code, variables, timeout=0, mode='lines'):
+        """提交一次性能分析执行，返回 ProfileRun"""
+        run = ProfileRun(self, code, variables, timeout, mode)
+        run.start()
+        return run
+
+    def run_benchmark(self, code, variables, timeout=0):
+        """提交一次基准测试，返回 BenchmarkRun"""
+        run = BenchmarkRun(self, code, variables, timeout, self.config.get("benchmark_repeat", 7))
+        run.start()
+        return run
+
+    def run_sweep(self, code, names, points, timeout=0):
+        """提交一次批量执行，返回 SweepRun"""
+        run = SweepRun(self, code, names, points, timeout, self.config.get("sweep_workers", 0))
+        run.start()
+        return run
+
+    def shutdown(self):
+        """关闭所有进程"""
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+        if self.session_worker is not None:
+            self.session_worker.stop()
+            self.session_worker = None
+
+
+def server_address(name):
+    """本地执行服务的地址：Windows 上为命名管道名，其他平台为配置目录下的 Unix 套接字路径"""
+    if sys.platform == 'win32':
+        return name
+    return os.path.join(os.path.dirname(CONFIG_PATH), f"{name}.sock")
+
+
+def send_request(request, name=DEFAULT_CONFIG["server_name"], timeout=None):
+    """向正在运行的 SidePython 发送一行 JSON 请求，返回解析后的回复
+
+    连接不上（未运行或未开启本地执行服务）时抛出 OSError。
+    """
+    data = (json.dumps(request, ensure_ascii=False) + "\n").encode('utf-8')
+    if sys.platform == 'win32':
+        with open(rf"\\.\pipe\{name}", 'r+b', buffering=0) as pipe:
+            pipe.write(data)
+            reply = pipe.readline()
+    else:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(server_address(name))
+            sock.sendall(data)
+            with sock.makefile('rb') as stream:
+                reply = stream.readline()
+    if not reply:
+        raise OSError("连接已断开，没有收到回复")
+    return json.loads(reply)
+
+
+def forward_to_instance(argv):
+    """若已有 SidePython 实例在运行，请它显示窗口（并打开 argv 中的第一个文件），返回是否转发成功"""
+    path = next((os.path.abspath(arg) for arg in argv if not arg.startswith('-')), "")
+    try:
+        reply = send_request(
+            {'command': 'show', 'file': path},
+            load_config().get("server_name", DEFAULT_CONFIG["server_name"]), timeout=1
+        )
+    except (OSError, ValueError):
+        return False
+    return bool(reply.get('ok'))
+
+
+def cli_main(argv=None):
+    """无界面模式入口，返回进程退出码"""
+    parser = argparse.ArgumentParser(
+        prog="sidepython",
+        description="无界面执行一段 Python 代码",
+        epilog="其余 --名称 值 形式的参数作为输入变量传入，如 --x 5 --y 2"
+    )
+    parser.add_argument("--run", required=True, metavar="FILE", help="要执行的代码文件，- 表示从标准输入读取")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果（输出、错误、耗时、CPU 时间、峰值内存）")
+    parser.add_argument("--time", action="store_true", help="在标准错误中打印执行耗时、CPU 时间和峰值内存")
+    parser.add_argument("--sweep", action="store_true",
+                        help="批量模式：变量可写作 0:10:0.5、1,2,3 或 @data.csv:列名，结果以 CSV 输出")
+    parser.add_argument("--remote", action="store_true",
+                        help="交给正在运行的 SidePython 执行（需开启本地执行服务），省去解释器启动和模块导入")
+    args, extra = parser.parse_known_args(argv)
+    if args.remote and args.sweep:
+        parser.error("--remote 不支持批量模式")
+
+    # 解析 --x 5 / --x=5 形式的输入变量
+    values = []
+    tokens = iter(extra)
+    for token in tokens:
+        if not token.startswith("--"):
+            parser.error(f"无法识别的参数：{token}")
+        name, sep, text = token[2:].partition("=")
+        if not sep:
+            text = next(tokens, None)
+            if text is None:
+                parser.error(f"变量 {name} 缺少取值")
+        if not name.isidentifier():
+            parser.error(f"无效的变量名：{name}")
+        values.append((name, text))
+
+    try:
+        if args.run == "-":
+            code = sys.stdin.read()
+        else:
+            with open(args.run, encoding="utf-8") as f:
+                code = f.read()
+        config = load_config()
+        if args.sweep:
+            names, points = expand_grid(values, config["sweep_max_points"])
+        else:
+            variables = parse_inputs(values)
+    except (OSError, InputError) as e:
+        print(f"❌ 错误：{e}", file=sys.stderr)
+        return 2
+
+    if args.sweep:
+        return _cli_sweep(code, names, points, config)
+    if args.remote:
+        return _cli_remote(code, values, variables, config, args)
+
+    meter = ResourceMeter()
+    meter.start()
+    if args.json:
+        result = run_code(code, variables)
+        result.update(meter.stop())
+        print(json.dumps(result, ensure_ascii=False))
+    else:
+        result = run_code(code, variables, sys.stdout, sys.stderr)
+        result.update(meter.stop())
+        if not result['ok']:
+            print(f"❌ 错误：{result['error']}", file=sys.stderr)
+
+    if args.time:
+        print(format_run_stats(result), file=sys.stderr)
+    return 0 if result['ok'] else 1
+
+
+def _cli_remote(code, values, variables, config, args):
+    """通过本地执行服务执行，输出格式与本地执行相同"""
+    # 数组文件的相对路径按本进程的工作目录解析，交给服务端时换成绝对路径
+    inputs = {
+        name: variables[name].spec() if isinstance(variables[name], ArrayInput) else text
+        for name, text in values
+    }
+    try:
+        result = send_request({'code': code, 'inputs': inputs}, config["server_name"])
+    except (OSError, ValueError) as e:
+        print(f"❌ 错误：无法连接到 SidePython 本地执行服务（{e}），请确认程序正在运行且已开启 server_enabled", file=sys.stderr)
+        return 2
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False))
+    else:
+        sys.stdout.write(result.get('output', ''))
+        if not result.get('ok'):
+            print(f"❌ 错误：{result.get('error')}", file=sys.stderr)
+    if args.time and 'elapsed' in result:
+        print(format_run_stats(result), file=sys.stderr)
+    return 0 if result.get('ok') else 1
+
+
+def _cli_sweep(code, names, points, config):
+    """无界面批量执行：结果 CSV 写到标准输出，汇总写到标准错误"""
+    pool = WorkerPool(config)
+    try:
+        run = pool.run_sweep(code, names, points, config.get("timeout", 0))
+        while (result := run.poll()) is None:
+            time.sleep(0.01)
+    finally:
+        pool.shutdown()
+    write_sweep_csv(sys.stdout, names, points, result['rows'])
+    print(format_sweep_stats(result['stats']), file=sys.stderr)
+    return 0 if result['stats']['failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(cli_main())
@@ -0,0 +1,65 @@
+"""单元格模式的依赖分析与增量执行"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sidepython_engine import CellState, cell_names, new_namespace, run_cells
+
+
+def test_augmented_assignment_reads_target():
+    defines, uses = cell_names("x += 1")
+    assert defines == {'x'}
+    assert uses == {'x'}
+
+
+def test_augmented_assignment_reruns_after_upstream_change():
+    namespace = new_namespace()
+    state = CellState()
+    result = run_cells("# %%\nx = 1\n# %%\nx += 1\n", {}, namespace, state)
+    assert result['ok']
+    assert namespace['x'] == 2
+
+    result = run_cells("# %%\nx = 5\n# %%\nx += 1\n", {}, namespace, state)
+    assert result['ok']
+    assert [cell['status'] for cell in result['cells']] == ['ran', 'ran']
+    assert namespace['x'] == 6
+
+
+def test_method_call_mutation_defines_object():
+    defines, uses = cell_names("data.append(x)\nconfig['a'].update(b=1)\nlen(data)")
+    assert defines == {'data', 'config'}
+    assert {'data', 'config', 'x'} <= uses
+    # 函数体内的调用在定义时不执行
+    assert cell_names("def f():\n    data.append(1)")[0] == {'f'}
+
+
+def test_mutating_cell_reruns_from_definition():
+    namespace = new_namespace()
+    state = CellState()
+    code = "# %%\ndata = []\n# %%\ndata.append(1)\n# %%\ntotal = sum(data)\n"
+    assert run_cells(code, {}, namespace, state)['ok']
+    assert namespace['total'] == 1
+
+    # 只修改了追加的单元格：从定义 data 的单元格重跑，不会在上次的列表上重复追加，下游也随之更新
+    result = run_cells(code.replace("append(1)", "append(2)"), {}, namespace, state)
+    assert result['ok']
+    assert [cell['status'] for cell in result['cells']] == ['ran', 'ran', 'ran']
+    assert namespace['data'] == [2] and namespace['total'] == 2
+
+    # 与被修改的名称无关的单元格照常跳过
+    code = "# %%\nn = 10\n# %%\ndata = []\n# %%\ndata.append(n)\n"
+    assert run_cells(code, {}, namespace, state)['ok']
+    result = run_cells(code.replace("append(n)", "append(n * 2)"), {}, namespace, state)
+    assert [cell['status'] for cell in result['cells']] == ['skipped', 'ran', 'ran']
+    assert namespace['data'] == [20]
+
+
+def test_cells_input_change_reruns_readers():
+    namespace = new_namespace()
+    state = CellState()
+    code = "# %%\na = 1\n# %%\nb = x * 2\n"
+    assert run_cells(code, {'x': 1.0}, namespace, state)['ok']
+    result = run_cells(code, {'x': 3.0}, namespace, state)
+    assert [cell['status'] for cell in result['cells']] == ['skipped', 'ran']
+    assert namespace['b'] == 6.0
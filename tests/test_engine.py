@@ -0,0 +1,128 @@
+"""执行引擎（不依赖 Qt）的单元测试"""
+import os
+import signal
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from sidepython_engine import (
+    DEFAULT_CONFIG, CellState, CodeCache, InputError, MemoCache, RunLimits, expand_grid, new_namespace,
+    parse_inputs, parse_sweep_value, run_benchmark, run_cells, run_code, run_sweep_chunk
+)
+
+
+def test_benchmark_runs_as_module_code():
+    # 这些写法放进 timeit 的函数体里会出错或改变含义
+    for code in ("x = x * 2", "from math import *\ny = sqrt(x)", "global z\nz = x"):
+        result = run_benchmark(code, {'x': 3.0}, repeat=2, min_time=0.01)
+        assert result['ok'], result.get('error')
+        assert result['loops'] >= 1 and len(result['times']) == 2
+
+
+def test_benchmark_setup_cell():
+    # 准备单元格中定义的名字（包括函数引用的全局变量）在被测单元格中可见
+    code = "# %%\nscale = 3\ndef f(v):\n    return v * scale\n# %%\nf(x)\n"
+    result = run_benchmark(code, {'x': 2}, repeat=1, min_time=0.01)
+    assert result['ok'], result.get('error')
+    assert run_benchmark("y = undefined_name", {}, repeat=1, min_time=0.01)['error'].startswith("NameError")
+
+
+
+def test_output_limit_not_swallowed_by_except_exception():
+    limits = RunLimits(dict(DEFAULT_CONFIG, memory_limit_mb=0, output_limit_mb=0.001), None)
+    code = "while True:\n    try:\n        print('x' * 100)\n    except Exception:\n        pass\n"
+    rows = run_sweep_chunk(code, [{}, {}], limits)
+    for row in rows:
+        assert not row['ok'] and row['error'].startswith("输出超出限制")
+        assert len(row['output']) <= 1024
+
+
+@pytest.mark.skipif(not hasattr(signal, 'setitimer'), reason="Windows 上由监视线程限制 CPU 时间")
+def test_cpu_limit_is_not_rounded_up():
+    channel = type('Channel', (), {'lock': threading.Lock()})()
+    limits = RunLimits(dict(DEFAULT_CONFIG, memory_limit_mb=0, cpu_limit_s=0.2), channel)
+    handler = signal.getsignal(signal.SIGPROF)
+    limits.install()
+    try:
+        start = time.process_time()
+        row, = run_sweep_chunk("while True:\n    pass\n", [{}], limits)
+        spent = time.process_time() - start
+    finally:
+        signal.signal(signal.SIGPROF, handler)
+    assert not row['ok'] and row['error'].startswith("CPU 时间超出限制")
+    assert spent < 0.6
+
+
+def test_memory_error_detected_by_type():
+    limits = RunLimits(dict(DEFAULT_CONFIG, memory_limit_mb=64), None)
+    result = limits.run(lambda: run_code("raise MemoryError()", {}))
+    assert result['error'].startswith("内存超出限制") and 'memory_error' not in result
+    # 只是信息里提到 MemoryError 的其他异常保持原样
+    result = limits.run(lambda: run_code("raise ValueError('MemoryError in cache')", {}))
+    assert result['error'] == "ValueError: MemoryError in cache"
+    # 单元格模式保留出错单元格的说明
+    code = "# %%\nx = 1\n# %%\nraise MemoryError('big')\n"
+    result = limits.run(lambda: run_cells(code, {}, new_namespace(), CellState()))
+    assert result['error'].startswith("单元格（第 3 行）：内存超出限制")
+
+
+def test_sweep_csv_column(tmp_path):
+    data = tmp_path / "data.csv"
+    data.write_text("a,b\n1,10\n2,20\n", encoding='utf-8')
+    assert parse_sweep_value(f"@{data}") == [1.0, 2.0]
+    assert parse_sweep_value(f"@{data}:b") == [10.0, 20.0]
+    assert parse_sweep_value(f"@{data}:1") == [10.0, 20.0]
+    # 文件不存在时报告原样的输入，而不是把文件名当成列名
+    with pytest.raises(InputError, match="'missing.csv'"):
+        parse_sweep_value("@missing.csv")
+    with pytest.raises(InputError, match="没有列 'c'"):
+        parse_sweep_value(f"@{data}:c")
+
+
+def test_parse_inputs():
+    assert parse_inputs([('x', '5'), ('y', ''), ('z', '[1, 2]'), ('a', "'abc'")]) == {
+        'x': 5.0, 'y': 0.0, 'z': [1, 2], 'a': 'abc',
+    }
+    with pytest.raises(InputError):
+        parse_inputs([('x', 'not a number')])
+
+
+def test_expand_grid():
+    names, points = expand_grid([('x', '0:3'), ('y', '1,2')])
+    assert names == ['x', 'y']
+    assert points == [{'x': x, 'y': y} for x in (0.0, 1.0, 2.0) for y in (1.0, 2.0)]
+    assert parse_sweep_value("0:1:0.25") == [0.0, 0.25, 0.5, 0.75]
+    with pytest.raises(InputError):
+        expand_grid([('x', '0:100'), ('y', '0:100')], max_points=1000)
+    with pytest.raises(InputError):
+        parse_sweep_value("0:1:-1")
+
+
+def test_code_cache():
+    cache = CodeCache(maxsize=2)
+    first, cached = cache.get("a = 1")
+    assert not cached and cache.get("a = 1") == (first, True)
+    error, _ = cache.get("def (")
+    assert isinstance(error, SyntaxError) and cache.get("def (")[1]
+    cache.get("b = 2")
+    # 超出容量时淘汰最久未使用的条目
+    assert not cache.get("a = 1")[1]
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_memo_cache(tmp_path):
+    memo = MemoCache(path=str(tmp_path / "memo.sqlite3"), max_bytes=4096)
+    key = memo.key("print(x)", {'x': 1.0})
+    assert key == memo.key("print(x)", {'x': 1.0}) != memo.key("print(x)", {'x': 2.0})
+    assert memo.get(key) is None
+    memo.put(key, {'chunks': [('stdout', '1.0\n')], 'result': {'ok': True}})
+    assert memo.get(key)['chunks'] == [['stdout', '1.0\n']]
+    # 超出总大小时淘汰最早的条目
+    for i in range(20):
+        memo.put(memo.key("pass", {'i': i}), {'chunks': [('stdout', 'x' * 500)], 'result': {}})
+    assert memo.get(key) is None
+    assert memo.clear() > 0
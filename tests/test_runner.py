@@ -0,0 +1,76 @@
+"""通过 GUI 使用的 CodeRunner 驱动各类执行（offscreen）"""
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from PySide6.QtWidgets import QApplication
+
+from sidepython import CodeRunner
+from sidepython_engine import DEFAULT_CONFIG, expand_grid
+
+
+@pytest.fixture(scope="module")
+def runner():
+    app = QApplication.instance() or QApplication([])
+    config = dict(DEFAULT_CONFIG, workers=1, sweep_workers=2)
+    runner = CodeRunner(config)
+    runner.pool.start()
+    yield runner
+    runner.shutdown()
+    app.processEvents()
+
+
+def wait_finished(runner, start, limit=30):
+    """调用 start() 启动执行，处理事件直到 finished 信号，返回 (结果, 流式输出)"""
+    results = []
+    chunks = []
+    runner.finished.connect(results.append)
+    runner.output.connect(chunks.extend)
+    try:
+        start()
+        deadline = time.monotonic() + limit
+        while not results and time.monotonic() < deadline:
+            QApplication.processEvents()
+            time.sleep(0.005)
+    finally:
+        runner.finished.disconnect(results.append)
+        runner.output.disconnect(chunks.extend)
+    assert results, "执行没有结束"
+    return results[0], chunks
+
+
+def test_run_streams_output(runner):
+    result, chunks = wait_finished(runner, lambda: runner.run("print(x * 2)", {'x': 21.0}))
+    assert result['ok']
+    assert ''.join(text for _, text in chunks) == "42.0\n"
+
+
+def test_sweep_through_code_runner(runner):
+    names, points = expand_grid([('x', '0:6'), ('y', '1,2')])
+    result, _ = wait_finished(runner, lambda: runner.run_sweep("result = x * y", names, points))
+    assert result['ok'] and result['sweep']
+    assert [row['value'] for row in result['rows']] == [repr(p['x'] * p['y']) for p in points]
+    assert not runner.is_running()
+
+
+def test_sweep_reuses_workers(runner, monkeypatch):
+    import sidepython_engine
+
+    spawned = []
+
+    class CountingWorker(sidepython_engine.WorkerProcess):
+        def __init__(self, *args):
+            super().__init__(*args)
+            spawned.append(self)
+
+    monkeypatch.setattr(sidepython_engine, 'WorkerProcess', CountingWorker)
+    names, points = expand_grid([('x', '0:16')])
+    result, _ = wait_finished(runner, lambda: runner.run_sweep("result = x", names, points))
+    assert result['ok']
+    # 池中原有 1 个进程，并行数为 2：整个批量执行只需新建 1 个，结束后池缩回原大小
+    assert len(spawned) == 1
+    assert len(runner.pool.workers) == 1